@@ -1,15 +1,41 @@
 import os
+import io
 import argparse
 from datetime import datetime, timedelta
+from functools import lru_cache
 import pytz
 from garminconnect import Garmin
 import xml.etree.ElementTree as ET
 import math
+import numpy as np
 
 # ------------------------------------------------------------------
 # Automated VO2max Calculation, Race Predictions & Load Focus
 # ------------------------------------------------------------------
 
+# fully qualified TCX tags and Trackpoint child paths, no namespace map lookups per point
+TCX = '{http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2}'
+NS3 = '{http://www.garmin.com/xmlschemas/ActivityExtension/v2}'
+TRACKPOINT_TAG = TCX + 'Trackpoint'
+HR_PATH = TCX + 'HeartRateBpm/' + TCX + 'Value'
+SPEED_PATH = TCX + 'Extensions/' + NS3 + 'TPX/' + NS3 + 'Speed'
+TIME_PATH = TCX + 'Time'
+
+
+# every calculation below reads the same days, so each Garmin response is fetched once per run
+@lru_cache(maxsize=8)
+def cached_stats(garmin_obj, date_str):
+    return garmin_obj.get_stats(date_str)
+
+
+@lru_cache(maxsize=64)
+def cached_activities(garmin_obj, start_date_str, end_date_str):
+    return garmin_obj.get_activities_by_date(start_date_str, end_date_str)
+
+
+ZONE_KEYS = tuple(f'hrTimeInZone_{z}' for z in range(1, 6))
+
+
 def calculate_vo2max_ratio(stats):
     """
     Estimate VO2max via Uth heart-rate ratio method: 15.3 * (HRmax/HRrest)
@@ -31,55 +57,51 @@ def calculate_vo2max_segmented(garmin_obj, date_str):
       • predict VO2max from slope*HRmax+intercept
     """
     # fetch stats
-    stats = garmin_obj.get_stats(date_str)
+    stats = cached_stats(garmin_obj, date_str)
     rhr = stats.get('restingHeartRate')
     maxhr = stats.get('maxHeartRate')
     if not rhr or not maxhr or maxhr <= rhr:
         return None
-    # gather track data
-    track = []
-    activities = garmin_obj.get_activities_by_date(date_str, date_str)
+    # gather track data (HR and speed of every timed Trackpoint)
+    hrs = []; sps = []
+    activities = cached_activities(garmin_obj, date_str, date_str)
     for a in activities:
         if not a.get('hasPolyline'):
             continue
-        tcx = garmin_obj.download_activity(a['activityId'], dl_fmt=garmin_obj.ActivityDownloadFormat.TCX).decode('utf-8')
-        root = ET.fromstring(tcx)
-        ns = {'tcx':'http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2',
-              'ns3':'http://www.garmin.com/xmlschemas/ActivityExtension/v2'}
-        for tp in root.findall('.//tcx:Trackpoint', ns):
-            hr = tp.findtext('tcx:HeartRateBpm/tcx:Value', namespaces=ns)
-            sp = tp.findtext('tcx:Extensions/ns3:TPX/ns3:Speed', namespaces=ns)
-            t = tp.findtext('tcx:Time', namespaces=ns)
-            if hr and sp and t:
-                track.append((datetime.fromisoformat(t.replace('Z','')).timestamp(), float(hr), float(sp)))
+        tcx = garmin_obj.download_activity(a['activityId'], dl_fmt=garmin_obj.ActivityDownloadFormat.TCX)
+        # streamed: each Trackpoint is read when it closes and cleared right after, no full document tree
+        for _, tp in ET.iterparse(io.BytesIO(tcx)):
+            if tp.tag != TRACKPOINT_TAG:
+                continue
+            hr = tp.findtext(HR_PATH)
+            sp = tp.findtext(SPEED_PATH)
+            if hr and sp and tp.findtext(TIME_PATH):
+                hrs.append(hr); sps.append(sp)
+            tp.clear()
     # segment at ≥70% HRmax for ≥600s
     hr_thr = rhr + 0.7 * (maxhr - rhr)
-    segments = []
-    seg = []
-    for t, hr, sp in track:
-        if hr >= hr_thr:
-            seg.append((hr, sp))
-        else:
-            if len(seg) >= 600:
-                segments.append(seg)
-            seg = []
-    if len(seg) >= 600:
-        segments.append(seg)
+    hr_arr = np.array(hrs, dtype=float)
+    sp_arr = np.array(sps, dtype=float)
+    above = hr_arr >= hr_thr
+    edges = np.diff(above.astype(np.int8), prepend=0, append=0)
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    keep = (ends - starts) >= 600
     # if no segments, fallback to ratio
-    if not segments:
+    if not keep.any():
         return calculate_vo2max_ratio(stats)
+    # samples inside a kept segment: the runs of `above` appear in order, one keep flag each
+    in_seg = above.copy()
+    in_seg[above] = np.repeat(keep, ends - starts)
     # linear regression X=HR, Y=VO2_inst
-    X=[]; Y=[]
-    for seg in segments:
-        for hr, sp in seg:
-            vo2_inst = 0.2 * (sp*60) + 3.5
-            X.append(hr); Y.append(vo2_inst)
-    xm = sum(X)/len(X); ym = sum(Y)/len(Y)
-    num = sum((xi-xm)*(yi-ym) for xi,yi in zip(X,Y))
-    den = sum((xi-xm)**2 for xi in X)
+    X = hr_arr[in_seg]
+    Y = 0.2 * (sp_arr[in_seg]*60) + 3.5
+    xm = X.mean(); ym = Y.mean()
+    dx = X - xm
+    num = np.dot(dx, Y - ym)
+    den = np.dot(dx, dx)
     if den==0: return calculate_vo2max_ratio(stats)
     slope = num/den; intercept = ym - slope*xm
-    return slope*maxhr + intercept
+    return float(slope*maxhr + intercept)
 
 
 def fetch_vo2max(garmin_obj, date_str):
@@ -89,7 +111,7 @@ def fetch_vo2max(garmin_obj, date_str):
     vo2_seg = calculate_vo2max_segmented(garmin_obj, date_str)
     if vo2_seg:
         return round(vo2_seg,2)
-    stats = garmin_obj.get_stats(date_str)
+    stats = cached_stats(garmin_obj, date_str)
     vo2_ratio = calculate_vo2max_ratio(stats)
     return round(vo2_ratio,2) if vo2_ratio else None
 
@@ -113,18 +135,17 @@ def calculate_training_load_focus(garmin_obj, end_date_str, days=7):
     """
     Weekly HR-zone focus percentages
     """
-    zones=[0]*5
     end=datetime.strptime(end_date_str,'%Y-%m-%d').replace(tzinfo=pytz.UTC)
-    for i in range(days):
-        d=(end - timedelta(days=i)).strftime('%Y-%m-%d')
-        for act in garmin_obj.get_activities_by_date(d,d):
-            for z in range(1,6): zones[z-1]+=act.get(f'hrTimeInZone_{z}',0) or 0
-    total=sum(zones)
+    start_date_str=(end - timedelta(days=days-1)).strftime('%Y-%m-%d')
+    # one request for the whole window instead of one per day
+    activities=cached_activities(garmin_obj, start_date_str, end_date_str) if days > 0 else []
+    zones=np.array([[act.get(key) or 0 for key in ZONE_KEYS] for act in activities], dtype=float).reshape(-1, len(ZONE_KEYS)).sum(axis=0)
+    total=zones.sum()
     if total==0: return None
     return {
-        'low_aerobic':round((zones[0]+zones[1])/total*100,1),
-        'high_aerobic':round((zones[2]+zones[3])/total*100,1),
-        'anaerobic':round(zones[4]/total*100,1)
+        'low_aerobic':round(float((zones[0]+zones[1])/total*100),1),
+        'high_aerobic':round(float((zones[2]+zones[3])/total*100),1),
+        'anaerobic':round(float(zones[4]/total*100),1)
     }
 
 
@@ -1,10 +1,180 @@
 # %%
+import io
 import logging
-import math
 import xml.etree.ElementTree as ET
-from datetime import datetime, timedelta
-from statistics import mean, median
-import pytz
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache, reduce
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+
+# %%
+# Garmin calls shared by several metrics (and by garmin_fetch's own fetchers) are
+# memoized per (client, date), and TCX downloads per activity. garmin_fetch clears
+# the caches at the start of every fetch cycle so intraday data for "today" is
+# never served stale; the small per-date size keeps the date being written and
+# the one being prefetched while bounding memory on long backfills.
+@lru_cache(maxsize=8)
+def cached_stats(garmin_obj, date_str):
+    return garmin_obj.get_stats(date_str)
+
+
+@lru_cache(maxsize=8)
+def cached_activities(garmin_obj, date_str):
+    return garmin_obj.get_activities_by_date(date_str, date_str)
+
+
+@lru_cache(maxsize=8)
+def cached_heart_rates(garmin_obj, date_str):
+    return garmin_obj.get_heart_rates(date_str)
+
+
+@lru_cache(maxsize=8)
+def cached_weigh_ins(garmin_obj, date_str):
+    return garmin_obj.get_weigh_ins(date_str, date_str)
+
+
+@lru_cache(maxsize=8)
+def cached_sleep(garmin_obj, date_str):
+    return garmin_obj.get_sleep_data(date_str)
+
+
+@lru_cache(maxsize=8)
+def cached_training_status(garmin_obj, date_str):
+    return garmin_obj.get_training_status(date_str)
+
+
+@lru_cache(maxsize=32)
+def cached_tcx(garmin_obj, activity_id):
+    return garmin_obj.download_activity(activity_id, dl_fmt=garmin_obj.ActivityDownloadFormat.TCX)
+
+
+def prefetch_tcx(garmin_obj, activity_ids, max_workers):
+    """
+    Warm cached_tcx for several activities with at most max_workers concurrent
+    downloads, so the consumers' sequential loops only parse. Failed downloads are not cached
+    and surface again (with the usual handling) when the consumer asks for them.
+    """
+    activity_ids = [a for a in activity_ids if a is not None]
+    if len(activity_ids) < 2:
+        return
+
+    def warm(activity_id):
+        try:
+            cached_tcx(garmin_obj, activity_id)
+        except Exception as e:
+            log.debug("TCX prefetch failed for %s: %s", activity_id, e)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        list(pool.map(warm, activity_ids))
+
+
+def warm_day_caches(garmin_obj, date_str, influxdbclient, tracks, max_workers):
+    """
+    Fill the caches several metrics share for date_str (the InfluxDB history
+    and, with tracks, the parsed TCX tracks of the day's activities) before
+    the metrics run concurrently. lru_cache is not single-flight, so metrics
+    racing on a cold entry would each query or download it. Failures are not
+    cached and surface again in the metric that needs the value.
+    """
+    try:
+        _load_day_history(date_str, influxdbclient)
+    except Exception as e:
+        log.debug("History prefetch failed for %s: %s", date_str, e)
+    if not tracks:
+        return
+    activity_ids = [
+        a["activityId"] for a in cached_activities(garmin_obj, date_str)
+        if a.get("hasPolyline") or a.get("activityType", {}).get("typeKey") == "running"
+    ]
+    prefetch_tcx(garmin_obj, activity_ids, max_workers)
+    for activity_id in activity_ids:
+        try:
+            cached_tcx_track(garmin_obj, activity_id)
+        except Exception as e:
+            log.debug("TCX prefetch failed for %s: %s", activity_id, e)
+
+
+def clear_garmin_cache():
+    for cached in (cached_stats, cached_activities, cached_heart_rates, cached_weigh_ins,
+                   cached_sleep, cached_training_status, cached_tcx, cached_tcx_track, _load_day_history):
+        cached.cache_clear()
+
+
+@lru_cache(maxsize=8)
+def utc_midnight(date_str):
+    # 00:00 UTC of a "%Y-%m-%d" date; parsed once per date for all metrics and fetchers
+    # (datetimes are immutable, so the cached value is safe to share)
+    return datetime.fromisoformat(date_str).replace(tzinfo=timezone.utc)
+
+
+# %%
+TRIMP_HISTORY_DAYS = 42
+
+
+@lru_cache(maxsize=64)
+def _load_day_history(date_str, influxdbclient):
+    """
+    All InfluxDB history the per-day metrics read for date_str, fetched in one
+    multi-statement round trip (oldest first):
+      • daily banisterTRIMP for the 42 days ending on date_str, NaN on days
+        without a recorded load (ATL, CTL, ACWR)
+      • nightly avgOvernightHrv for the last 28 nights (HRV baseline)
+      • ReadinessInputs sleepScore for the last 3 days (sleep history)
+    The arrays are shared between callers and therefore read-only.
+    """
+    day = utc_midnight(date_str)
+    start = day - timedelta(days=TRIMP_HISTORY_DAYS - 1)
+    end = day + timedelta(hours=23, minutes=59, seconds=59)
+    start_s = int(start.timestamp())
+    # epoch='s' returns the 1d buckets as integer seconds, so the day index is
+    # plain integer arithmetic instead of a strptime per row
+    trimp_res, hrv_res, sleep_res = influxdbclient.query(
+        "SELECT last(\"banisterTRIMP\") AS trimp "
+        "FROM \"TrainingLoad\" "
+        "WHERE time >= $start AND time <= $end "
+        "GROUP BY time(1d); "
+        "SELECT last(\"avgOvernightHrv\") AS hrv "
+        "FROM \"SleepSummary\" "
+        "WHERE time >= $hrv_start AND time <= $day "
+        "GROUP BY time(1d); "
+        "SELECT last(\"sleepScore\") AS sc "
+        "FROM \"ReadinessInputs\" "
+        "WHERE time >= $sleep_start AND time < $next_day "
+        "GROUP BY time(1d)",
+        bind_params={
+            "start": start.isoformat(), "end": end.isoformat(),
+            "hrv_start": (day - timedelta(days=27)).isoformat(), "day": day.isoformat(),
+            "sleep_start": (day - timedelta(days=2)).isoformat(), "next_day": (day + timedelta(days=1)).isoformat(),
+        },
+        epoch="s"
+    )
+    loads = np.full(TRIMP_HISTORY_DAYS, np.nan)
+    for p in trimp_res.get_points():
+        if p.get("trimp") is None:
+            continue
+        i = (p["time"] - start_s) // 86400
+        if 0 <= i < TRIMP_HISTORY_DAYS:
+            loads[i] = p["trimp"]
+    hrv = np.array([p["hrv"] for p in hrv_res.get_points() if p.get("hrv") is not None], dtype=np.float64)
+    scores = np.array([p["sc"] for p in sleep_res.get_points() if p.get("sc") is not None], dtype=np.float64)
+    for arr in (loads, hrv, scores):
+        arr.flags.writeable = False
+    return loads, hrv, scores
+
+
+def _load_history(date_str, influxdbclient):
+    """
+    Daily banisterTRIMP for the 42 days ending on date_str (oldest first),
+    NaN on days without a recorded load. One query serves ATL, CTL and ACWR.
+    """
+    return _load_day_history(date_str, influxdbclient)[0]
+
+
+def _recorded(loads):
+    return loads[~np.isnan(loads)]
 
 
 # %%
@@ -12,34 +182,44 @@ def get_training_load(garmin_obj, date_str, start_dt, end_dt):
     """
     Calculate Banister TRIMP for the activity slice between start_dt and end_dt.
     """
-    stats = garmin_obj.get_stats(date_str)
+    stats = cached_stats(garmin_obj, date_str)
     rhr = stats.get("restingHeartRate")
     maxhr = stats.get("maxHeartRate")
     if rhr is None or maxhr is None or maxhr <= rhr:
-        logging.debug(f"Skipping TRIMP: invalid RHR/MHR ({rhr}/{maxhr})")
+        log.debug("Skipping TRIMP: invalid RHR/MHR (%s/%s)", rhr, maxhr)
         return 0.0
 
-    hr_vals = garmin_obj.get_heart_rates(date_str).get("heartRateValues") or []
+    hr_vals = cached_heart_rates(garmin_obj, date_str).get("heartRateValues") or []
     if len(hr_vals) < 2:
-        logging.debug("No intraday HR, skipping TRIMP")
+        log.debug("No intraday HR, skipping TRIMP")
         return 0.0
 
     start_ms = int(start_dt.timestamp() * 1000)
     end_ms = int(end_dt.timestamp() * 1000)
 
-    window = [(t, hr) for t, hr in hr_vals if hr is not None and start_ms <= t < end_ms]
-    if len(window) < 2:
+    # None HR samples become NaN and fall out of the window mask
+    samples = np.array(hr_vals, dtype=np.float64)
+    t_arr = samples[:, 0].astype(np.int64)
+    hr_arr = samples[:, 1]
+    in_window = ~np.isnan(hr_arr) & (t_arr >= start_ms) & (t_arr < end_ms)
+    t_arr, hr_arr = t_arr[in_window], hr_arr[in_window]
+    if t_arr.size < 2:
         return 0.0
 
-    total_trimp = 0.0
-    for (t0, hr0), (t1, hr1) in zip(window, window[1:]):
-        dt_min = (t1 - t0) / 1000.0 / 60.0
-        hr_mid = (hr0 + hr1) / 2.0
-        x = (hr_mid - rhr) / (maxhr - rhr)
-        if x > 0:
-            total_trimp += dt_min * x * math.exp(1.92 * x)
+    # in-place ufuncs keep the kernel at three interval-sized buffers (x, its
+    # exponential, dt) instead of a temporary per arithmetic step
+    x = hr_arr[:-1] + hr_arr[1:]
+    x *= 0.5
+    x -= rhr
+    x /= maxhr - rhr
+    # clamping at 0 zeroes sub-resting intervals (dt * 0 * e^0) without a gather
+    np.maximum(x, 0.0, out=x)
+    weight = np.multiply(x, 1.92)
+    np.exp(weight, out=weight)
+    x *= np.diff(t_arr) / 60000.0
+    total_trimp = np.dot(x, weight)
 
-    return total_trimp
+    return float(total_trimp)
 
 
 # %%
@@ -49,38 +229,49 @@ def get_vo2max(garmin_obj, date_str, garmin_device_name):
       VO2max = 15.3 * (HRmax / HRrest)
     (Uth N. et al., Eur J Appl Physiol 2004) :contentReference[oaicite:0]{index=0}
     """
-    points_list = []
-
     # 1) grab resting & max HR from daily stats
-    stats = garmin_obj.get_stats(date_str)
+    stats = cached_stats(garmin_obj, date_str)
     rhr = stats.get("restingHeartRate")
     maxhr = stats.get("maxHeartRate")
     if rhr is None or maxhr is None or rhr <= 0:
-        logging.debug(f"Skipping VO2max for {date_str}: invalid RHR/MHR ({rhr}/{maxhr})")
+        log.debug("Skipping VO2max for %s: invalid RHR/MHR (%s/%s)", date_str, rhr, maxhr)
         return []
 
     # 2) compute VO2max
     vo2 = 15.3 * (maxhr / rhr)
 
     # 3) timestamp at UTC midnight
-    ts = (
-        datetime.strptime(date_str, "%Y-%m-%d")
-        .replace(tzinfo=pytz.UTC)
-        .isoformat()
-    )
+    ts = utc_midnight(date_str).isoformat()
 
-    points_list.append({
+    points_list = [{
         "measurement": "VO2Max",
         "time": ts,
         "tags": {"Device": garmin_device_name},
         "fields": {"estimatedVo2Max": round(vo2, 2)}
-    })
+    }]
 
-    logging.info(f"Success : Estimated VO2max={vo2:.2f} ml/kg/min for {date_str}")
+    log.info("Success : Estimated VO2max=%.2f ml/kg/min for %s", vo2, date_str)
     return points_list
 
 
 # %%
+def vo2_run(s_m_s):
+    # ACSM flat running: 0.2 ml/kg/min per m/min of speed, i.e. 12 per m/s
+    return 12.0 * s_m_s + 3.5
+
+
+def vo2_cyc(watts, cyc_slope):
+    # ACSM cycling, cyc_slope = 1.8 * 6.12 / weight_kg precomputed per day
+    return cyc_slope * watts + 7
+
+
+VO2_ACTIVITY_TYPES = ("running", "cycling", "cycling_road", "cycling_mountain", "cycling_indoor", "indoor_cycling", "virtual_ride")
+
+
+def _is_cycling(typ):
+    return typ.startswith(("cycling", "virtual_ride", "indoor_cycling"))
+
+
 def get_activity_vo2(garmin_obj, date_str, influxdbclient, garmin_device_name):
     """
     Estimate per-activity VO₂ for running and cycling on date_str:
@@ -89,50 +280,53 @@ def get_activity_vo2(garmin_obj, date_str, influxdbclient, garmin_device_name):
     """
     points = []
 
-    # 1) get a weight for cycling (if any)
+    # 1) fetch all activities for that day
+    acts = cached_activities(garmin_obj, date_str)
+    types = [act.get("activityType", {}).get("typeKey") for act in acts]
+
+    # 2) get a weight for cycling (if any) - only looked up when the day has a cycling activity
     weight = None
-    wdata = garmin_obj.get_weigh_ins(date_str, date_str) \
-        .get('dailyWeightSummaries', [])
-    if wdata:
-        for m in wdata[0].get('allWeightMetrics', []):
-            if m.get('weight') is not None:
-                weight = m['weight']
-                break
-
-    # 1b) Fallback: if still no weight, query InfluxDB for last known
-    if weight is None:
-        # midnight at end of the day
-        day_end = (
-            datetime.strptime(date_str, "%Y-%m-%d")
-            .replace(hour=23, minute=59, second=59, tzinfo=pytz.UTC)
-            .isoformat()
-        )
-        q = influxdbclient.query(
-            f"SELECT last(\"weight\") AS w "
-            f"FROM \"BodyComposition\" "
-            f"WHERE \"Device\" = '{garmin_device_name}' AND time <= '{day_end}'"
-        )
-        pts = list(q.get_points())
-        if pts and pts[0].get("w") is not None:
-            weight = pts[0]["w"]
-
-
-    # 2) fetch all activities for that day
-    acts = garmin_obj.get_activities_by_date(date_str, date_str)
+    if any(typ in VO2_ACTIVITY_TYPES and _is_cycling(typ) for typ in types):
+        wdata = cached_weigh_ins(garmin_obj, date_str) \
+            .get('dailyWeightSummaries', [])
+        if wdata:
+            for m in wdata[0].get('allWeightMetrics', []):
+                if m.get('weight') is not None:
+                    weight = m['weight']
+                    break
+
+        # 2b) Fallback: if still no weight, query InfluxDB for last known
+        if weight is None:
+            # midnight at end of the day
+            day_end = (utc_midnight(date_str) + timedelta(hours=23, minutes=59, seconds=59)).isoformat()
+            q = influxdbclient.query(
+                "SELECT last(\"weight\") AS w "
+                "FROM \"BodyComposition\" "
+                "WHERE \"Device\" = $device AND time <= $end",
+                bind_params={"device": garmin_device_name, "end": day_end}
+            )
+            pts = list(q.get_points())
+            if pts and pts[0].get("w") is not None:
+                weight = pts[0]["w"]
+
+    # Garmin and BodyComposition store grams; convert once, outside the activity loop
+    if weight:
+        weight_kg = weight / 1000.0
+        cyc_slope = 1.8 * 6.12 / weight_kg  # ml/kg/min per watt
+
     for act in acts:
         typ = act.get("activityType", {}).get("typeKey")
-        if typ not in ("running", "cycling", "cycling_road", "cycling_mountain", "cycling_indoor", "indoor_cycling", "virtual_ride"):
-            logging.info(f"Skipping VO2 for activity {act.get('activityId')} because type '{type}' is not in list")
+        if typ not in VO2_ACTIVITY_TYPES:
+            log.info("Skipping VO2 for activity %s because type '%s' is not in list", act.get('activityId'), typ)
             continue
 
         start = act.get("startTimeGMT")
         if not start:
-            logging.debug(f"Skipping VO2 for activity {act.get('activityId')}: no startTime")
+            log.debug("Skipping VO2 for activity %s: no startTime", act.get('activityId'))
             continue
 
-        # timestamp at activity start (UTC)
-        t0 = datetime.strptime(start, "%Y-%m-%d %H:%M:%S") \
-            .replace(tzinfo=pytz.UTC).isoformat()
+        # timestamp at activity start (UTC), "%Y-%m-%d %H:%M:%S" is accepted by fromisoformat
+        t0 = datetime.fromisoformat(start).replace(tzinfo=timezone.utc).isoformat()
 
         fields = {}
         tags = {
@@ -145,28 +339,19 @@ def get_activity_vo2(garmin_obj, date_str, influxdbclient, garmin_device_name):
             avg_sp = act.get("averageSpeed")  # m/s
             max_sp = act.get("maxSpeed")  # m/s
 
-            def vo2_run(s_m_s):
-                s_m_min = s_m_s * 60.0
-                return 0.2 * s_m_min + 3.5
-
             if avg_sp:
                 fields["vo2_run_avg"] = round(vo2_run(avg_sp), 2)
             if max_sp:
                 fields["vo2_run_peak"] = round(vo2_run(max_sp), 2)
 
-        if (typ.startswith("cycling") or typ.startswith("virtual_ride") or typ.startswith("indoor_cycling")) and weight:
+        if _is_cycling(typ) and weight:
             avg_pw = act.get("avgPower") or act.get("averageWatts")
             max_pw = act.get("maxPower") or act.get("maxWatts")
-            weight = weight / 1000.0
-
-            def vo2_cyc(watts):
-                work_rate = watts * 6.12
-                return (1.8 * work_rate / weight) + 7
 
             if avg_pw:
-                fields["vo2_cyc_avg"] = round(vo2_cyc(avg_pw), 2)
+                fields["vo2_cyc_avg"] = round(vo2_cyc(avg_pw, cyc_slope), 2)
             if max_pw:
-                fields["vo2_cyc_peak"] = round(vo2_cyc(max_pw), 2)
+                fields["vo2_cyc_peak"] = round(vo2_cyc(max_pw, cyc_slope), 2)
 
         if fields:
             points.append({
@@ -177,10 +362,130 @@ def get_activity_vo2(garmin_obj, date_str, influxdbclient, garmin_device_name):
             })
 
     if points:
-        logging.info(f"Success : Estimated VO₂ for {len(points)} point(s) on {date_str} with points: {points}")
+        log.info("Success : Estimated VO₂ for %s point(s) on %s with points: %s", len(points), date_str, points)
     return points
 
 
+# %%
+TCX_NS = {
+    "tcx": "http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2",
+    "ns3": "http://www.garmin.com/xmlschemas/ActivityExtension/v2"
+}
+TCX_TRACKPOINT_TAG = "{http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2}Trackpoint"
+# Trackpoint child paths pre-resolved to Clark notation, so findtext() needs no
+# per-call prefix/namespace-map expansion
+_TCX = "{%s}" % TCX_NS["tcx"]
+_NS3 = "{%s}" % TCX_NS["ns3"]
+TCX_HR_PATH = f"{_TCX}HeartRateBpm/{_TCX}Value"
+TCX_SPEED_PATH = f"{_TCX}Extensions/{_NS3}TPX/{_NS3}Speed"
+TCX_TIME_PATH = f"{_TCX}Time"
+TCX_HR_TAG = f"{_TCX}HeartRateBpm"
+TCX_VALUE_TAG = f"{_TCX}Value"
+TCX_SPEED_TAG = f"{_NS3}Speed"
+
+
+def tcx_time_utc(text):
+    """
+    TCX <Time>/<Id> value as a naive UTC ISO string for a datetime64 cast,
+    "NaT" when missing or malformed. Garmin writes UTC with a trailing "Z";
+    an explicit +hh:mm offset is converted to UTC instead of failing the cast.
+    """
+    if not text:
+        return "NaT"
+    if text.endswith("Z"):
+        return text[:-1]
+    try:
+        stamp = datetime.fromisoformat(text)
+    except ValueError:
+        return "NaT"
+    if stamp.tzinfo is not None:
+        stamp = stamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return stamp.isoformat()
+
+
+def _parse_tcx_track(tcx_bytes):
+    """
+    Stream the Trackpoints of a raw TCX download into parallel float64 arrays
+    (time, HR, speed). Every Trackpoint carrying HR and speed is kept, its time
+    is NaN when the Trackpoint has no Time, so one parse serves all consumers.
+    """
+    ts, hrs, sps = [], [], []
+    # Single sweep: the wanted children are picked up from their own end events
+    # (they close before their Trackpoint), so no per-Trackpoint path lookups.
+    # Lap summaries use AverageHeartRateBpm / AvgSpeed and never match.
+    hr = sp = t = None
+    for _, el in ET.iterparse(io.BytesIO(tcx_bytes)):
+        tag = el.tag
+        if tag == TCX_HR_TAG:
+            hr = el.findtext(TCX_VALUE_TAG)
+        elif tag == TCX_SPEED_TAG:
+            sp = el.text
+        elif tag == TCX_TIME_PATH:
+            t = el.text
+        elif tag == TCX_TRACKPOINT_TAG:
+            if hr and sp:
+                ts.append(tcx_time_utc(t))
+                hrs.append(hr)
+                sps.append(sp)
+            hr = sp = t = None
+            el.clear()  # drop parsed children, keeps memory flat on long activities
+    # NumPy converts the collected text columns in one pass, no per-sample float()
+    # or datetime objects; TCX times are UTC, returned as epoch seconds
+    times = np.array(ts, dtype="datetime64[ms]")
+    secs = times.astype(np.int64) / 1000.0
+    secs[np.isnat(times)] = np.nan
+    return secs, np.array(hrs, dtype=np.float64), np.array(sps, dtype=np.float64)
+
+
+@lru_cache(maxsize=32)
+def cached_tcx_track(garmin_obj, activity_id):
+    """
+    Parsed TCX track of an activity, shared by the segmented VO2max and the
+    lactate threshold so each download is parsed once; the arrays are shared
+    between callers and therefore read-only.
+    """
+    track = _parse_tcx_track(cached_tcx(garmin_obj, activity_id))
+    for column in track:
+        column.flags.writeable = False
+    return track
+
+
+# %%
+def _moments(x, y):
+    """
+    Centred moments (n, mean x, mean y, Σdx², Σdx·dy) of a sample. Working
+    about the sample means avoids the cancellation of raw-sum regression on
+    long, narrow-range HR series; combine several samples with _merge_moments.
+    """
+    mx, my = x.mean(), y.mean()
+    dx = x - mx
+    return x.size, mx, my, np.dot(dx, dx), np.dot(dx, y - my)
+
+
+def _merge_moments(a, b):
+    """
+    Pairwise (Chan et al.) merge of two _moments tuples.
+    """
+    na, mxa, mya, sxxa, sxya = a
+    nb, mxb, myb, sxxb, sxyb = b
+    n = na + nb
+    dx, dy = mxb - mxa, myb - mya
+    w = na * nb / n
+    return n, mxa + dx * nb / n, mya + dy * nb / n, sxxa + sxxb + dx * dx * w, sxya + sxyb + dx * dy * w
+
+
+def _linreg(moments):
+    """
+    Least-squares fit y = slope * x + intercept from merged _moments.
+    Returns (slope, intercept), or None if x has no variance.
+    """
+    n, mx, my, sxx, sxy = moments
+    if sxx == 0:
+        return None
+    slope = sxy / sxx
+    return float(slope), float(my - slope * mx)
+
+
 # %%
 def get_vo2max_segmented(garmin_obj, date_str, garmin_device_name):
     """
@@ -190,58 +495,44 @@ def get_vo2max_segmented(garmin_obj, date_str, garmin_device_name):
       • linear‐regress VO2 vs HR → VO2max
       • fallback to Uth HR‐ratio if no good segments
     """
-    points = []
-
     # 1) fetch RHR & HRmax
-    stats = garmin_obj.get_stats(date_str)
+    stats = cached_stats(garmin_obj, date_str)
     rhr = stats.get("restingHeartRate")
     maxhr = stats.get("maxHeartRate")
     if not rhr or not maxhr or maxhr <= rhr:
-        logging.debug(f"No valid RHR/MHR on {date_str}, skipping segmented VO2max")
+        log.debug("No valid RHR/MHR on %s, skipping segmented VO2max", date_str)
         return []
 
     # 2) fetch activity summaries and build ID→type map
-    acts = garmin_obj.get_activities_by_date(date_str, date_str)
+    acts = cached_activities(garmin_obj, date_str)
     id_type = {
         a["activityId"]: a.get("activityType", {}).get("typeKey")
         for a in acts if a.get("hasPolyline")
     }
     if not id_type:
-        logging.debug(f"No polyline activities on {date_str}, skipping segmented VO2max")
+        log.debug("No polyline activities on %s, skipping segmented VO2max", date_str)
         return []
 
     # 3) download all TCX GPS+HR points for those activities
-    track = []
-    ns = {
-        "tcx": "http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2",
-        "ns3": "http://www.garmin.com/xmlschemas/ActivityExtension/v2"
-    }
+    tracks = []
     for act_id in id_type:
         try:
-            tcx = garmin_obj.download_activity(act_id,
-                                               dl_fmt=garmin_obj.ActivityDownloadFormat.TCX
-                                               ).decode("utf-8")
+            ts, hrs, sps = cached_tcx_track(garmin_obj, act_id)
         except Exception as e:
-            logging.warning(f"Failed GPS download for {act_id}: {e}")
+            log.warning("Failed GPS download or parse for %s: %s", act_id, e)
             continue
 
-        root = ET.fromstring(tcx)
-        for tp in root.findall(".//tcx:Trackpoint", ns):
-            hr = tp.findtext("tcx:HeartRateBpm/tcx:Value", namespaces=ns)
-            sp = tp.findtext("tcx:Extensions/ns3:TPX/ns3:Speed", namespaces=ns)
-            t = tp.findtext("tcx:Time", namespaces=ns)
-            if hr and sp and t:
-                track.append((
-                    datetime.fromisoformat(t.replace("Z", "")).timestamp(),
-                    float(hr), float(sp)
-                ))
-
-    if not track:
-        logging.debug(f"No valid GPS+HR points on {date_str}, fallback to Uth")
+        timed = ~np.isnan(ts)  # segments are made of timed Trackpoints only
+        tracks.append((hrs[timed], sps[timed]))
+
+    hr_arr = np.concatenate([hrs for hrs, _ in tracks]) if tracks else np.empty(0)
+    sp_arr = np.concatenate([sps for _, sps in tracks]) if tracks else np.empty(0)
+
+    if not hr_arr.size:
+        log.debug("No valid GPS+HR points on %s, fallback to Uth", date_str)
         # fallback to Uth method
         vo2_uth = 15.3 * (maxhr / rhr)
-        ts = datetime.strptime(date_str, "%Y-%m-%d") \
-            .replace(tzinfo=pytz.UTC).isoformat()
+        ts = utc_midnight(date_str).isoformat()
         return [{
             "measurement": "VO2Max",
             "time": ts,
@@ -251,53 +542,37 @@ def get_vo2max_segmented(garmin_obj, date_str, garmin_device_name):
 
     # 4) segment into ≥10 min chunks at ≥70% HRmax
     hr_thr = rhr + 0.7 * (maxhr - rhr)
-    segments = []
-    seg = []
-    for t, hr, sp in track:
-        if hr >= hr_thr:
-            seg.append((t, hr, sp))
-        else:
-            if len(seg) >= 600:  # 10 min in seconds
-                segments.append(seg)
-            seg = []
-    if len(seg) >= 600:
-        segments.append(seg)
-
-    # 5) build regression data (HR vs ACSM VO2)
-    X = []
-    Y = []
-    for seg in segments:
-        for _, hr, sp in seg:
-            vo2_inst = 0.2 * (sp * 60) + 3.5
-            X.append(hr)
-            Y.append(vo2_inst)
-
+    edges = np.diff((hr_arr >= hr_thr).astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    keep = (ends - starts) >= 600  # 10 min in seconds
+    segments = list(zip(starts[keep], ends[keep]))
+
+    # 5) regression moments (HR vs ACSM VO2), merged across segment views
+    vo2_inst = 0.2 * (sp_arr * 60) + 3.5
     # 6) regress if possible
-    if X:
-        xm, ym = mean(X), mean(Y)
-        slope = sum((xi - xm) * (yi - ym) for xi, yi in zip(X, Y)) \
-                / sum((xi - xm) ** 2 for xi in X)
-        intercept = ym - slope * xm
+    fit = _linreg(reduce(_merge_moments, (_moments(hr_arr[a:b], vo2_inst[a:b]) for a, b in segments))) if segments else None
+    if fit is not None:
+        slope, intercept = fit
         vo2max = slope * maxhr + intercept
     else:
         vo2max = 15.3 * (maxhr / rhr)  # Uth fallback
 
     # 7) emit one point at midnight UTC
-    ts = datetime.strptime(date_str, "%Y-%m-%d") \
-        .replace(tzinfo=pytz.UTC).isoformat()
-    points.append({
+    ts = utc_midnight(date_str).isoformat()
+    points = [{
         "measurement": "VO2Max",
         "time": ts,
         "tags": {"Device": garmin_device_name},
         "fields": {"estimate": round(vo2max, 2)}
-    })
+    }]
 
-    logging.info(f"Segmented VO2max={vo2max:.2f} for {date_str}")
+    log.info("Segmented VO2max=%.2f for %s", vo2max, date_str)
     return points
 
 
 # %%
-def get_training_readiness(garmin_obj, date_str, influxdbclient, garmin_device_name):
+def get_training_readiness_computed(garmin_obj, date_str, influxdbclient, garmin_device_name):
     """
     Compute a 0–100 Training Readiness score:
       • Acute Load       (20%)  – today’s TRIMP vs 7‑day ATL
@@ -308,46 +583,53 @@ def get_training_readiness(garmin_obj, date_str, influxdbclient, garmin_device_n
       • Stress History 3D(10%) – avg stressPercentage last 3 days
     """
     points = []
-    day = datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=pytz.UTC)
+    day = utc_midnight(date_str)
     end_ts = (day + timedelta(hours=23, minutes=59, seconds=59)).isoformat()
 
-    # 1) TRIMP history → CTL & ATL
-    start_ctl = (day - timedelta(days=41)).isoformat()
-    res42 = influxdbclient.query(
-        f"SELECT last(\"banisterTRIMP\") AS trimp "
-        "FROM \"TrainingLoad\" "
-        f"WHERE time >= '{start_ctl}' AND time <= '{end_ts}' "
-        "GROUP BY time(1d)"
+    # All history windows are fetched in one multi-statement round-trip;
+    # results come back as a list of ResultSets in statement order.
+    start_3d = (day - timedelta(days=2)).isoformat()
+    sleep_res, s3, sres = influxdbclient.query(
+        # last night's sleep & HRV
+        "SELECT last(\"sleepScore\") AS slp, last(\"avgOvernightHrv\") AS hrv "
+        "FROM \"SleepSummary\" "
+        "WHERE time >= $day AND time <= $end; "
+        # sleep & stress history only feed a mean, so average the daily values server-side
+        "SELECT mean(\"slp\") AS slp FROM ("
+        "SELECT last(\"sleepScore\") AS slp "
+        "FROM \"SleepSummary\" "
+        "WHERE time >= $start_3d AND time <= $end "
+        "GROUP BY time(1d)); "
+        "SELECT mean(\"sp\") AS sp, count(\"sp\") AS n FROM ("
+        "SELECT last(\"stressPercentage\") AS sp "
+        "FROM \"DailyStats\" "
+        "WHERE time >= $start_3d AND time <= $end "
+        "GROUP BY time(1d))",
+        bind_params={
+            "start_3d": start_3d,
+            "day": day.isoformat(),
+            "end": end_ts,
+        }
     )
-    loads42 = [p["trimp"] for p in res42.get_points() if p.get("trimp") is not None]
 
-    start_atl = (day - timedelta(days=6)).isoformat()
-    res7 = influxdbclient.query(
-        f"SELECT last(\"banisterTRIMP\") AS trimp "
-        "FROM \"TrainingLoad\" "
-        f"WHERE time >= '{start_atl}' AND time <= '{end_ts}' "
-        "GROUP BY time(1d)"
-    )
-    loads7 = [p["trimp"] for p in res7.get_points() if p.get("trimp") is not None]
+    # 1) TRIMP history → CTL & ATL
+    history = _load_history(date_str, influxdbclient)
+    loads42 = _recorded(history)
+    loads7 = _recorded(history[-7:])
 
-    today_trimp = loads7[-1] if loads7 else 0.0
-    ctl = mean(loads42) if loads42 else 0.0
-    atl = mean(loads7) if loads7 else 0.0
+    today_trimp = float(loads7[-1]) if loads7.size else 0.0
+    ctl = float(loads42.mean()) if loads42.size else 0.0
+    atl = float(loads7.mean()) if loads7.size else 0.0
 
-    logging.debug(f"{date_str}: loads7={loads7}, today_trimp={today_trimp:.1f}, CTL={ctl:.1f}, ATL={atl:.1f}")
+    log.debug("%s: loads7=%s, today_trimp=%.1f, CTL=%.1f, ATL=%.1f", date_str, loads7, today_trimp, ctl, atl)
 
     # 2) Acute Load & Recovery (20% each)
     acute_score = 1.0 - min(today_trimp / atl, 1.0) if atl > 0 else 1.0
     recovery_score = acute_score
-    logging.debug(f"{date_str}: acute_score={acute_score:.3f}")
+    log.debug("%s: acute_score=%.3f", date_str, acute_score)
 
     # 3) Sleep & HRV (35% total)
-    sleep_res = influxdbclient.query(
-        f"SELECT last(\"sleepScore\") AS slp, last(\"avgOvernightHrv\") AS hrv "
-        "FROM \"SleepSummary\" "
-        f"WHERE time >= '{day.isoformat()}' AND time <= '{end_ts}'"
-    ).get_points()
-    rec = next(sleep_res, {})
+    rec = next(sleep_res.get_points(), {})
     sleep_last = rec.get("slp", 0.0)
     hrv = rec.get("hrv", 0.0)
     if hrv is None:
@@ -357,35 +639,22 @@ def get_training_readiness(garmin_obj, date_str, influxdbclient, garmin_device_n
     hrv_score = min(hrv / 50.0, 1.0)
 
     # Sleep history (last 3 nights)
-    start_sleep3 = (day - timedelta(days=2)).isoformat()
-    s3 = influxdbclient.query(
-        f"SELECT last(\"sleepScore\") AS slp "
-        "FROM \"SleepSummary\" "
-        f"WHERE time >= '{start_sleep3}' AND time <= '{end_ts}' "
-        "GROUP BY time(1d)"
-    )
-    sleeps = [p["slp"] for p in s3.get_points() if p.get("slp") is not None]
-    sleep_hist_score = (mean(sleeps) / 100.0) if sleeps else sleep_score
+    sleep_hist = next(s3.get_points(), {}).get("slp")
+    sleep_hist_score = (sleep_hist / 100.0) if sleep_hist is not None else sleep_score
 
-    logging.debug(f"{date_str}: sleep_last={sleep_last}, sleep_hist_scores={sleeps}")
+    log.debug("%s: sleep_last=%s, sleep_hist_mean=%s", date_str, sleep_last, sleep_hist)
 
     # 4) Stress history (last 3 days) – use stressPercentage
-    start_str3 = (day - timedelta(days=2)).isoformat()
-    sres = influxdbclient.query(
-        f"SELECT last(\"stressPercentage\") AS sp "
-        "FROM \"DailyStats\" "
-        f"WHERE time >= '{start_str3}' AND time <= '{end_ts}' "
-        "GROUP BY time(1d)"
-    )
-    stress_pcts = [p["sp"] for p in sres.get_points() if p.get("sp") is not None]
-    avg_pct = mean(stress_pcts) if stress_pcts else 0.0
+    stress_rec = next(sres.get_points(), {})
+    avg_pct = stress_rec.get("sp") or 0.0
+    stress_days = stress_rec.get("n") or 0
 
-    if len(stress_pcts) < 3:
+    if stress_days < 3:
         stress_score = 0.5
     else:
         stress_score = 1.0 - min(avg_pct / 100.0, 1.0)
 
-    logging.info(f"{date_str}: stress_pcts={stress_pcts}, stress_score={stress_score:.3f}")
+    log.info("%s: stress_days=%s, avg_stress_pct=%.1f, stress_score=%.3f", date_str, stress_days, avg_pct, stress_score)
 
     # 5) Combine with weights
     readiness = (
@@ -398,12 +667,11 @@ def get_training_readiness(garmin_obj, date_str, influxdbclient, garmin_device_n
     )
     readiness_pct = round(readiness * 100)
 
-    logging.info(
-        f"{date_str} – components: acute={acute_score:.3f}, hrv={hrv_score:.3f}, "
-        f"rec={recovery_score:.3f}, sleepLN={sleep_score:.3f}, "
-        f"sleep3N={sleep_hist_score:.3f}, stress={stress_score:.3f}"
+    log.info(
+        "%s – components: acute=%.3f, hrv=%.3f, rec=%.3f, sleepLN=%.3f, sleep3N=%.3f, stress=%.3f",
+        date_str, acute_score, hrv_score, recovery_score, sleep_score, sleep_hist_score, stress_score
     )
-    logging.info(f"Training Readiness: {readiness_pct}%")
+    log.info("Training Readiness: %s%%", readiness_pct)
 
     # 6) Write to Influx
     points.append({
@@ -418,7 +686,7 @@ def get_training_readiness(garmin_obj, date_str, influxdbclient, garmin_device_n
             "sleepScore": round(sleep_last, 1),
             "sleepHist": round(sleep_hist_score * 100, 1),
             "avgOvernightHrv": round(hrv, 1),
-            "stressPct": round(avg_pct if stress_pcts else 0, 1)
+            "stressPct": round(avg_pct, 1)
         }
     })
 
@@ -434,30 +702,22 @@ def get_hrv_baseline(garmin_obj, date_str, influxdbclient, garmin_device_name):
       - ratio    = trend / baseline
     Returns list of InfluxDB points or [] if insufficient data.
     """
-    points = []
-    day = datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=pytz.UTC)
-
-    # Query last 28 nights of RMSSD
-    start28 = (day - timedelta(days=27)).isoformat()
-    res = influxdbclient.query(
-        f"SELECT last(\"avgOvernightHrv\") AS hrv "
-        f"FROM \"SleepSummary\" "
-        f"WHERE time >= '{start28}' AND time <= '{day.isoformat()}' "
-        "GROUP BY time(1d)"
-    )
-    arr = [p["hrv"] for p in res.get_points() if p.get("hrv") is not None]
+    day = utc_midnight(date_str)
+
+    # Last 28 nights of RMSSD, from the shared per-day history query
+    arr = _load_day_history(date_str, influxdbclient)[1]
 
     # Need at least 7 values to form a baseline
-    if len(arr) < 7:
-        logging.debug(f"Skipping HRV baseline for {date_str}: only {len(arr)} days of data")
+    if arr.size < 7:
+        log.debug("Skipping HRV baseline for %s: only %s days of data", date_str, arr.size)
         return []
 
-    baseline = mean(arr[-7:])
-    trend = mean(arr[-3:])
+    baseline = float(arr[-7:].mean())
+    trend = float(arr[-3:].mean())
     ratio = trend / baseline if baseline else None
 
     ts = day.isoformat()
-    points.append({
+    points = [{
         "measurement": "HRVTrend",
         "time": ts,
         "tags": {"Device": garmin_device_name},
@@ -466,8 +726,8 @@ def get_hrv_baseline(garmin_obj, date_str, influxdbclient, garmin_device_name):
             "trend": round(trend, 1),
             "ratio": round(ratio, 3) if ratio is not None else None
         }
-    })
-    logging.info(f"Success : HRV-baseline={baseline:.1f}, trend={trend:.1f}, ratio={ratio:.3f} on {date_str}")
+    }]
+    log.info("Success : HRV-baseline=%.1f, trend=%.1f, ratio=%s on %s", baseline, trend, round(ratio, 3) if ratio is not None else None, date_str)
     return points
 
 
@@ -478,49 +738,32 @@ def get_acwr(garmin_obj, date_str, influxdbclient, garmin_device_name):
     ACWR = mean(TRIMP last 7 days) / mean(TRIMP last 28 days)
     Returns a list of InfluxDB points or an empty list if not enough data.
     """
-    points = []
-    day = datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=pytz.UTC)
-
-    # Helper to query TRIMP over a date range (inclusive)
-    def query_trimp(start_dt, end_dt):
-        q = (
-            influxdbclient.query(
-                f"SELECT last(\"banisterTRIMP\") AS trimp "
-                f"FROM \"TrainingLoad\" "
-                f"WHERE time >= '{start_dt}' AND time <= '{end_dt}' "
-                "GROUP BY time(1d)"
-            )
-            .get_points()
-        )
-        return [p["trimp"] for p in q if p.get("trimp") is not None]
+    day = utc_midnight(date_str)
 
-    # Define windows
-    end_ts = day.isoformat()
-    start7 = (day - timedelta(days=6)).isoformat()
-    start28 = (day - timedelta(days=27)).isoformat()
-
-    wk7 = query_trimp(start7, end_ts)
-    wk28 = query_trimp(start28, end_ts)
+    # 7- and 28-day windows are the tail of the shared 42-day TRIMP history
+    history = _load_history(date_str, influxdbclient)
+    wk7 = _recorded(history[-7:])
+    wk28 = _recorded(history[-28:])
 
     # Need at least one week and four weeks of data
-    if len(wk7) < 1 or len(wk28) < 1:
+    if wk7.size < 1 or wk28.size < 1:
         return []
 
-    if mean(wk28) == 0:
-        logging.warning("Chronic (28-day) average is zero; cannot compute ACWR → returning 0")
+    if wk28.mean() == 0:
+        log.warning("Chronic (28-day) average is zero; cannot compute ACWR → returning 0")
         return []
 
-    acwr = mean(wk7) / mean(wk28)
+    acwr = float(wk7.mean() / wk28.mean())
 
     # Build point at midnight UTC
     ts = day.isoformat()
-    points.append({
+    points = [{
         "measurement": "TrainingLoad",
         "time": ts,
         "tags": {"Device": garmin_device_name},
         "fields": {"ACWR": round(acwr, 2)}
-    })
-    logging.info(f"Success : Calculated ACWR={acwr:.2f} for {date_str}")
+    }]
+    log.info("Success : Calculated ACWR=%.2f for %s", acwr, date_str)
     return points
 
 
@@ -531,10 +774,8 @@ def get_custom_lactate_threshold(garmin_obj, date_str, garmin_device_name):
       • target HR = 0.88 * HRmax ±3 bpm
       • average pace (min/km) when HR in that band
     """
-    points = []
-
     # 1) fetch HRmax
-    stats = garmin_obj.get_stats(date_str)
+    stats = cached_stats(garmin_obj, date_str)
     maxhr = stats.get("maxHeartRate")
     if not maxhr:
         return []
@@ -543,55 +784,34 @@ def get_custom_lactate_threshold(garmin_obj, date_str, garmin_device_name):
     lo, hi = hr_target - 3, hr_target + 3
 
     # 2) download TCX for each run
-    acts = garmin_obj.get_activities_by_date(date_str, date_str)
-    pace_list = []
-    ns = {
-        "tcx": "http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2",
-        "ext": "http://www.garmin.com/xmlschemas/ActivityExtension/v2"
-    }
+    acts = cached_activities(garmin_obj, date_str)
+    pace_chunks = []
 
     for a in acts:
         if a.get("activityType", {}).get("typeKey") != "running":
             continue
-        tcx = garmin_obj.download_activity(
-            a["activityId"],
-            dl_fmt=garmin_obj.ActivityDownloadFormat.TCX
-        ).decode("utf-8")
-        root = ET.fromstring(tcx)
-
-        for tp in root.findall(".//tcx:Trackpoint", ns):
-            hr = tp.findtext("tcx:HeartRateBpm/tcx:Value", namespaces=ns)
-            sp = tp.findtext("tcx:Extensions/ext:TPX/ext:Speed", namespaces=ns)
-            if not hr or not sp:
-                continue
-
-            hr = float(hr)
-            speed_m_s = float(sp)
-
-            # skip zero/invalid speeds
-            if speed_m_s <= 0:
-                continue
-
-            if lo <= hr <= hi and speed_m_s > 2:  # ~7 km/h
-                # correct pace formula: (1000 m)/(speed m/s) -> seconds, /60 -> minutes
-                pace_min_per_km = (1000.0 / speed_m_s) / 60.0
-                pace_list.append(pace_min_per_km)
-
-    if not pace_list:
-        logging.debug(f"No valid threshold-speed points on {date_str}")
+        _, hrs, sps = cached_tcx_track(garmin_obj, a["activityId"])
+
+        # HR inside the band at running speed (> ~7 km/h, which also drops zero/invalid speeds)
+        in_band = (hrs >= lo) & (hrs <= hi) & (sps > 2)
+        # pace: (1000 m)/(speed m/s) -> seconds, /60 -> minutes
+        pace_chunks.append((1000.0 / sps[in_band]) / 60.0)
+
+    paces = np.concatenate(pace_chunks) if pace_chunks else np.empty(0)
+    if not paces.size:
+        log.debug("No valid threshold-speed points on %s", date_str)
         return []
 
-    med_pace = median(pace_list)
-    logging.debug(f"{len(pace_list)} threshold points on {date_str}, median pace={med_pace:.2f}")
+    med_pace = float(np.median(paces))
+    log.debug("%s threshold points on %s, median pace=%.2f", paces.size, date_str, med_pace)
 
     mins = int(med_pace)
     secs = int(round((med_pace - mins) * 60))
     pace_str = f"{mins:02d}:{secs:02d}"
 
     # 3) write result at midnight UTC
-    ts = datetime.strptime(date_str, "%Y-%m-%d") \
-        .replace(tzinfo=pytz.UTC).isoformat()
-    points.append({
+    ts = utc_midnight(date_str).isoformat()
+    points = [{
         "measurement": "LactateThreshold",
         "time": ts,
         "tags": {"Device": garmin_device_name},
@@ -600,16 +820,16 @@ def get_custom_lactate_threshold(garmin_obj, date_str, garmin_device_name):
             "pace_lactate_num": round(med_pace, 2),
             "pace_lactate_str": pace_str
         }
-    })
+    }]
 
-    logging.info(f"LT HR≈{hr_target:.1f}, median pace≈{med_pace:.2f} min/km on {date_str}")
+    log.info("LT HR≈%.1f, median pace≈%.2f min/km on %s", hr_target, med_pace, date_str)
     return points
 
 
 # %%
 def get_training_load_focus(garmin_obj, date_str, garmin_device_name):
     pts = []
-    ts = garmin_obj.get_training_status(date_str)
+    ts = cached_training_status(garmin_obj, date_str)
     lf = ts.get('loadFocus', {})
     if lf:
         fields = {
@@ -621,9 +841,7 @@ def get_training_load_focus(garmin_obj, date_str, garmin_device_name):
         }
         pts.append({
             "measurement": "TrainingLoadFocus",
-            "time": datetime.strptime(date_str, "%Y-%m-%d")
-            .replace(hour=12, tzinfo=pytz.UTC)
-            .isoformat(),
+            "time": utc_midnight(date_str).replace(hour=12).isoformat(),
             "tags": {"Device": garmin_device_name},
             "fields": fields
         })
@@ -637,29 +855,15 @@ def compute_ctl_atl(date_str, influxdbclient, device):
       • ATL = mean(TRIMP last 7 days)
       • CTL = mean(TRIMP last 42 days)
     """
-    # parse our reference day at UTC midnight
-    day = datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=pytz.UTC)
-    end_ts = day + timedelta(hours=23, minutes=59, seconds=59)
-
-    # helper to query banisterTRIMP over a window
-    def query_trimp(start_delta_days):
-        start = (day - timedelta(days=start_delta_days - 1)).isoformat()
-        end   = end_ts.isoformat()
-        q = influxdbclient.query(
-            f"SELECT last(\"banisterTRIMP\") AS trimp "
-            f"FROM \"TrainingLoad\" "
-            f"WHERE time >= '{start}' AND time <= '{end}' "
-            "GROUP BY time(1d)"
-        ).get_points()
-        return [pt["trimp"] for pt in q if pt.get("trimp") is not None]
+    history = _load_history(date_str, influxdbclient)
 
     # ATL = 7-day average
-    trimp_7  = query_trimp(7)
-    atl      = mean(trimp_7) if trimp_7 else 0.0
+    trimp_7  = _recorded(history[-7:])
+    atl      = float(trimp_7.mean()) if trimp_7.size else 0.0
 
     # CTL = 42-day average
-    trimp_42 = query_trimp(42)
-    ctl      = mean(trimp_42) if trimp_42 else 0.0
+    trimp_42 = _recorded(history)
+    ctl      = float(trimp_42.mean()) if trimp_42.size else 0.0
 
     return atl, ctl
 
@@ -672,17 +876,17 @@ def get_readiness_inputs(garmin_obj, date_str, influxdbclient, device):
     in your Grafana query will work correctly.
     """
     # 1) Build day boundaries
-    day = datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=pytz.UTC)
+    day = utc_midnight(date_str)
     start_dt = day
     end_dt   = day + timedelta(days=1)
 
     # 2) Pull Garmin daily stats
-    stats = garmin_obj.get_stats(date_str) or {}
+    stats = cached_stats(garmin_obj, date_str) or {}
     bb_wake    = stats.get("bodyBatteryAtWakeTime") or stats.get("bodyBatteryAtWake") or None
     stress_pct = stats.get("stressPercentage") or 0.0
 
     # 3) Pull sleep summary
-    sleep = garmin_obj.get_sleep_data(date_str) or {}
+    sleep = cached_sleep(garmin_obj, date_str) or {}
     avg_hrv     = sleep.get("avgOvernightHrv") or None
     sleep_score = (sleep.get("dailySleepDTO", {})
                        .get("sleepScores", {})
@@ -690,13 +894,8 @@ def get_readiness_inputs(garmin_obj, date_str, influxdbclient, device):
                        .get("value")) or None
 
     # 4) Compute 3-night sleep history
-    pts = list(influxdbclient.query(
-        f"SELECT last(\"sleepScore\") AS sc "
-        f"FROM \"ReadinessInputs\" "
-        f"WHERE time >= '{(day - timedelta(days=2)).isoformat()}' AND time < '{end_dt.isoformat()}' "
-        "GROUP BY time(1d)"
-    ).get_points())
-    sleep_hist = round(mean([p["sc"] for p in pts if p.get("sc") is not None]), 1) if pts else None
+    scores = _load_day_history(date_str, influxdbclient)[2]
+    sleep_hist = round(float(scores.mean()), 1) if scores.size else None
 
     # 5) Compute today’s acuteLoad, ATL & CTL
     trimp_today = get_training_load(garmin_obj, date_str, start_dt, end_dt) or 0.0
@@ -1,11 +1,16 @@
 # %%
-import base64, requests, time, pytz, logging, os, sys, dotenv, io, zipfile
+import base64, requests, time, pytz, logging, os, sys, dotenv, io, zipfile, random, json, hashlib, threading, re, math
 from fitparse import FitFile, FitParseError
 from datetime import datetime, timedelta
 from influxdb import InfluxDBClient
-from influxdb.exceptions import InfluxDBClientError
+from influxdb.exceptions import InfluxDBClientError, InfluxDBServerError
+from influxdb.line_protocol import make_line
 from influxdb_client_3 import InfluxDBClient3, InfluxDBError
 import xml.etree.ElementTree as ET
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from urllib.parse import urljoin
 from garth.exc import GarthHTTPError
 from garminconnect import (
     Garmin,
@@ -18,12 +23,28 @@ from custom_metrics import (
     get_vo2max,
     get_activity_vo2,
     get_vo2max_segmented,
-    get_training_readiness,
+    get_training_readiness_computed,
     get_custom_lactate_threshold,
     get_acwr,
     get_hrv_baseline,
     get_training_load_focus,
-    get_readiness_inputs
+    get_readiness_inputs,
+    cached_stats,
+    cached_heart_rates,
+    cached_activities,
+    cached_weigh_ins,
+    cached_sleep,
+    cached_training_status,
+    cached_tcx,
+    clear_garmin_cache,
+    warm_day_caches,
+    utc_midnight,
+    tcx_time_utc,
+    TCX_NS,
+    TCX_TRACKPOINT_TAG,
+    TCX_HR_PATH,
+    TCX_SPEED_PATH,
+    TCX_TIME_PATH
 )
 
 garmin_obj = None
@@ -45,6 +66,14 @@ if env_override:
     logging.warning("System ENV variables are overridden with override-default-vars.env")
 
 # %%
+ENV_TRUE_VALUES = frozenset(['True', 'true', 'TRUE','t', 'T', 'yes', 'Yes', 'YES', '1'])
+ENV_FALSE_VALUES = frozenset(['False','false','FALSE','f','F','no','No','NO','0'])
+def env_flag(name, default):
+    # Flags off by default are only switched on by a true-like value, flags on by default only switched off by a false-like one
+    if default:
+        return os.getenv(name) not in ENV_FALSE_VALUES
+    return os.getenv(name) in ENV_TRUE_VALUES
+
 INFLUXDB_VERSION = os.getenv("INFLUXDB_VERSION",'1') # Your influxdb database version (accepted values are '1' or '3')
 assert INFLUXDB_VERSION in ['1','3'], "Only InfluxDB version 1 or 3 is allowed - please ensure to set this value to either 1 or 3"
 INFLUXDB_HOST = os.getenv("INFLUXDB_HOST",'your.influxdb.hostname') # Required
@@ -56,29 +85,46 @@ INFLUXDB_V3_ACCESS_TOKEN = os.getenv("INFLUXDB_V3_ACCESS_TOKEN",'') # InfluxDB V
 TOKEN_DIR = os.getenv("TOKEN_DIR", "~/.garminconnect") # optional
 GARMINCONNECT_EMAIL = os.environ.get("GARMINCONNECT_EMAIL", None) # optional, asks in prompt on run if not provided
 GARMINCONNECT_PASSWORD = base64.b64decode(os.getenv("GARMINCONNECT_BASE64_PASSWORD")).decode("utf-8") if os.getenv("GARMINCONNECT_BASE64_PASSWORD") != None else None # optional, asks in prompt on run if not provided
-GARMINCONNECT_IS_CN = True if os.getenv("GARMINCONNECT_IS_CN") in ['True', 'true', 'TRUE','t', 'T', 'yes', 'Yes', 'YES', '1'] else False # optional if you are using a Chinese account
+GARMINCONNECT_IS_CN = env_flag("GARMINCONNECT_IS_CN", False) # optional if you are using a Chinese account
 GARMIN_DEVICENAME = os.getenv("GARMIN_DEVICENAME", "Unknown")  # optional, attempts to set the name automatically if not given
 GARMIN_DEVICEID = os.getenv("GARMIN_DEVICEID", None)  # optional, attempts to set the id automatically if not given
-AUTO_DATE_RANGE = False if os.getenv("AUTO_DATE_RANGE") in ['False','false','FALSE','f','F','no','No','NO','0'] else True # optional
+AUTO_DATE_RANGE = env_flag("AUTO_DATE_RANGE", True) # optional
 MANUAL_START_DATE = os.getenv("MANUAL_START_DATE", None) # optional, in YYYY-MM-DD format, if you want to bulk update only from specific date
 MANUAL_END_DATE = os.getenv("MANUAL_END_DATE", datetime.today().strftime('%Y-%m-%d')) # optional, in YYYY-MM-DD format, if you want to bulk update until a specific date
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO") # optional
 FETCH_FAILED_WAIT_SECONDS = int(os.getenv("FETCH_FAILED_WAIT_SECONDS", 1800)) # optional
 RATE_LIMIT_CALLS_SECONDS = int(os.getenv("RATE_LIMIT_CALLS_SECONDS", 5)) # optional
-INFLUXDB_ENDPOINT_IS_HTTP = False if os.getenv("INFLUXDB_ENDPOINT_IS_HTTP") in ['False','false','FALSE','f','F','no','No','NO','0'] else True # optional
+INFLUXDB_ENDPOINT_IS_HTTP = env_flag("INFLUXDB_ENDPOINT_IS_HTTP", True) # optional
 GARMIN_DEVICENAME_AUTOMATIC = False if GARMIN_DEVICENAME != "Unknown" else True # optional
 UPDATE_INTERVAL_SECONDS = int(os.getenv("UPDATE_INTERVAL_SECONDS", 300)) # optional
 FETCH_SELECTION = os.getenv("FETCH_SELECTION", "daily_avg,sleep,steps,heartrate,stress,breathing,hrv,fitness_age,vo2,activity,race_prediction,body_composition") # additional available values are lactate_threshold,training_status,training_readiness,hill_score,endurance_score,blood_pressure,hydration,solar_intensity which you can add to the list seperated by , without any space
 LACTATE_THRESHOLD_SPORTS = os.getenv("LACTATE_THRESHOLD_SPORTS", "RUNNING").upper().split(",") # Garmin currently implements RUNNING, but has provisions for CYCLING, and SWIMMING
-KEEP_FIT_FILES = True if os.getenv("KEEP_FIT_FILES") in ['True', 'true', 'TRUE','t', 'T', 'yes', 'Yes', 'YES', '1'] else False # optional
+KEEP_FIT_FILES = env_flag("KEEP_FIT_FILES", False) # optional
 FIT_FILE_STORAGE_LOCATION = os.getenv("FIT_FILE_STORAGE_LOCATION", os.path.join(os.path.expanduser("~"), "fit_filestore"))
-ALWAYS_PROCESS_FIT_FILES = True if os.getenv("ALWAYS_PROCESS_FIT_FILES") in ['True', 'true', 'TRUE','t', 'T', 'yes', 'Yes', 'YES', '1'] else False # optional, will process all FIT files for all activities including indoor ones lacking GPS data
-REQUEST_INTRADAY_DATA_REFRESH = True if os.getenv("REQUEST_INTRADAY_DATA_REFRESH") in ['True', 'true', 'TRUE','t', 'T', 'yes', 'Yes', 'YES', '1'] else False # optional, This requests data refresh for the intraday data (older than 6 months) - see issue #77. Pauses the script for 24 hours when the daily limit is reached.
+ALWAYS_PROCESS_FIT_FILES = env_flag("ALWAYS_PROCESS_FIT_FILES", False) # optional, will process all FIT files for all activities including indoor ones lacking GPS data
+REQUEST_INTRADAY_DATA_REFRESH = env_flag("REQUEST_INTRADAY_DATA_REFRESH", False) # optional, This requests data refresh for the intraday data (older than 6 months) - see issue #77. Pauses the script for 24 hours when the daily limit is reached.
 IGNORE_INTRADAY_DATA_REFRESH_DAYS = int(os.getenv("IGNORE_INTRADAY_DATA_REFRESH_DAYS", 30)) # optional, ignores the REQUEST_INTRADAY_DATA_REFRESH for the specified number of days from current date. 
-TAG_MEASUREMENTS_WITH_USER_EMAIL = True if os.getenv("TAG_MEASUREMENTS_WITH_USER_EMAIL") in ['True', 'true', 'TRUE','t', 'T', 'yes', 'Yes', 'YES', '1'] else False # Adds an additional "User_ID" tag in each measurement for multi user database support - see #96
-FORCE_REPROCESS_ACTIVITIES = False if os.getenv("FORCE_REPROCESS_ACTIVITIES") in ['False','false','FALSE','f','F','no','No','NO','0'] else True # optional, will enable re-processing of fit files when set to true, may skip activities if set to false (issue #30)
+TAG_MEASUREMENTS_WITH_USER_EMAIL = env_flag("TAG_MEASUREMENTS_WITH_USER_EMAIL", False) # Adds an additional "User_ID" tag in each measurement for multi user database support - see #96
+FORCE_REPROCESS_ACTIVITIES = env_flag("FORCE_REPROCESS_ACTIVITIES", True) # optional, will enable re-processing of fit files when set to true, may skip activities if set to false (issue #30)
 USER_TIMEZONE = os.getenv("USER_TIMEZONE", "") # optional, fetches timezone info from last activity automatically if left blank
+MAX_CONCURRENT_FETCHES = int(os.getenv("MAX_CONCURRENT_FETCHES", 4)) # optional, number of Garmin requests in flight at once (the day's endpoints, activity downloads, custom metrics and the next date's prefetch all share it), set to 1 for strictly sequential fetching
+INFLUXDB_WRITE_BATCH_SIZE = int(os.getenv("INFLUXDB_WRITE_BATCH_SIZE", 5000)) # optional, number of points buffered and sent per write request (keep well below 20000 to avoid Error 413 : payload too large)
+INFLUXDB_UDP_PORT = int(os.getenv("INFLUXDB_UDP_PORT", 0)) # optional, InfluxDB V1 only - sends the dense intraday series (HR, steps, stress, body battery, breathing, HRV, sleep samples) fire-and-forget to this UDP listener, which must be configured with precision = "s" and database = INFLUXDB_DATABASE. Lossy: leave at 0 to write everything over HTTP
+INFLUXDB_UDP_PACKET_BYTES = int(os.getenv("INFLUXDB_UDP_PACKET_BYTES", 8192)) # optional, upper bound of a single UDP datagram (rows are never split across datagrams)
+SKIP_EXISTING_DATES = env_flag("SKIP_EXISTING_DATES", False) # optional, a MANUAL_START_DATE bulk update skips the dates that are already fully written to the database (resume an interrupted backfill without fetching those dates again)
+GARMIN_RESPONSE_CACHE_DIR = os.getenv("GARMIN_RESPONSE_CACHE_DIR", "") # optional, caches Garmin API responses on disk during a MANUAL_START_DATE bulk update so an interrupted backfill can be resumed without requesting the same dates again (disabled when blank)
+GARMIN_RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("GARMIN_RESPONSE_CACHE_TTL_SECONDS", 86400)) # optional, cached responses older than this are requested again
+LAST_SYNC_STATE_FILE = os.getenv("LAST_SYNC_STATE_FILE", "") # optional, JSON file the periodic sync keeps its last synced watch upload time in - read on restart instead of querying InfluxDB for the latest HeartRateIntraday point (disabled when blank, delete it after wiping the database)
 PARSED_ACTIVITY_ID_LIST = []
+PENDING_POINTS = [] # write buffer, see write_points_to_influxdb / flush_points_to_influxdb
+PENDING_POINTS_KEPT = {'count': 0} # points a failed flush kept in PENDING_POINTS, they don't count towards the next batch
+PENDING_POINTS_LIMIT = 10 * INFLUXDB_WRITE_BATCH_SIZE # most points kept for a retry while InfluxDB is unreachable, older ones are dropped
+DEVICE_LAST_USED = {'ts': None, 'val': None} # cached get_device_last_used() response, see get_device_last_used
+FETCH_TODAY = datetime.today() # refreshed once per date by daily_fetch, read by the fetchers instead of calling datetime.today() each time
+FETCH_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_FETCHES) # shared by all dates, so a prefetched date's requests queue up behind the current one's
+GARMIN_REQUEST_SLOTS = threading.BoundedSemaphore(MAX_CONCURRENT_FETCHES) # held for the duration of every Garmin HTTP request, see bounded_request
+GARMIN_REQUEST_SLOT_HELD = threading.local()
+GARMIN_TOKEN_LOCK = threading.Lock() # a single OAuth2 token refresh when several requests find the token expired
 
 # %%
 for handler in logging.root.handlers[:]:
@@ -93,26 +139,31 @@ logging.basicConfig(
 )
 
 # %%
+# The custom metrics query InfluxDB from MAX_CONCURRENT_FETCHES threads at once; size the client's keep-alive
+# connection pool for them so concurrent queries don't open (and discard) extra connections
+INFLUXDB_POOL_SIZE = max(10, MAX_CONCURRENT_FETCHES)
 try:
     if INFLUXDB_ENDPOINT_IS_HTTP:
         if INFLUXDB_VERSION == '1':
-            influxdbclient = InfluxDBClient(host=INFLUXDB_HOST, port=INFLUXDB_PORT, username=INFLUXDB_USERNAME, password=INFLUXDB_PASSWORD)
+            influxdbclient = InfluxDBClient(host=INFLUXDB_HOST, port=INFLUXDB_PORT, username=INFLUXDB_USERNAME, password=INFLUXDB_PASSWORD, gzip=True, timeout=30, retries=5, pool_size=INFLUXDB_POOL_SIZE)
             influxdbclient.switch_database(INFLUXDB_DATABASE)
         else:
             influxdbclient = InfluxDBClient3(
             host=f"http://{INFLUXDB_HOST}:{INFLUXDB_PORT}",
             token=INFLUXDB_V3_ACCESS_TOKEN,
-            database=INFLUXDB_DATABASE
+            database=INFLUXDB_DATABASE,
+            enable_gzip=True
             )
     else:
         if INFLUXDB_VERSION == '1':
-            influxdbclient = InfluxDBClient(host=INFLUXDB_HOST, port=INFLUXDB_PORT, username=INFLUXDB_USERNAME, password=INFLUXDB_PASSWORD, ssl=True, verify_ssl=True)
+            influxdbclient = InfluxDBClient(host=INFLUXDB_HOST, port=INFLUXDB_PORT, username=INFLUXDB_USERNAME, password=INFLUXDB_PASSWORD, ssl=True, verify_ssl=True, gzip=True, timeout=30, retries=5, pool_size=INFLUXDB_POOL_SIZE)
             influxdbclient.switch_database(INFLUXDB_DATABASE)
         else:
             influxdbclient = InfluxDBClient3(
             host=f"https://{INFLUXDB_HOST}:{INFLUXDB_PORT}",
             token=INFLUXDB_V3_ACCESS_TOKEN,
-            database=INFLUXDB_DATABASE
+            database=INFLUXDB_DATABASE,
+            enable_gzip=True
             )
     demo_point = {
     'measurement': 'DemoPoint',
@@ -128,6 +179,7 @@ try:
 except (InfluxDBClientError, InfluxDBError) as err:
     logging.error("Unable to connect with influxdb database! Aborted")
     raise InfluxDBClientError("InfluxDB connection failed:" + str(err))
+influxdb_udp_client = InfluxDBClient(host=INFLUXDB_HOST, use_udp=True, udp_port=INFLUXDB_UDP_PORT) if INFLUXDB_VERSION == '1' and INFLUXDB_UDP_PORT else None
 
 # %%
 def iter_days(start_date: str, end_date: str):
@@ -142,6 +194,49 @@ def iter_days(start_date: str, end_date: str):
         current += timedelta(days=1)
 
 
+# %%
+UTC = pytz.UTC
+def _gmt_datetime(gmt_str):
+    # Garmin's "...GMT" strings are naive UTC timestamps; UTC has no DST so no localize() is needed
+    # datetime.fromisoformat accepts the "%Y-%m-%dT%H:%M:%S.%f" form since Python 3.11 and is C-implemented, far cheaper than strptime
+    return datetime.fromisoformat(gmt_str).replace(tzinfo=UTC)
+
+def _parse_gmt(gmt_str):
+    return _gmt_datetime(gmt_str).isoformat()
+
+# The dense intraday fetchers and the activity tracks emit line protocol rows directly (second precision) instead of point dicts
+def _lp_escape(value):
+    return str(value).replace("\\", "\\\\").replace(" ", "\\ ").replace(",", "\\,").replace("=", "\\=")
+
+def _lp_field(value):
+    # same field types as the dict serialisation: integers get the 'i' suffix, strings are quoted, anything else is a float.
+    # None for values a field can't hold (tuple/array values of some FIT fields, NaN, inf) - _lp_row drops those fields
+    if isinstance(value, bool):
+        return str(value)
+    if isinstance(value, int):
+        return f"{value}i"
+    if isinstance(value, str):
+        return '"' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return repr(value) if math.isfinite(value) else None
+
+def _lp_row(measurement, tag_set, fields, timestamp):
+    # make_line() for an already escaped tag set and an integer-second timestamp - fields sorted by key, None values
+    # and values _lp_field can't serialise dropped instead of failing the whole activity
+    field_set = ",".join(f"{key}={field}" for key, field in ((key, _lp_field(value)) for key, value in sorted(fields.items()) if value is not None) if field is not None)
+    return f"{measurement},{tag_set} {field_set} {timestamp}"
+
+def _lp_tag_set(**extra_tags):
+    # escaped once per fetcher call (or activity), the device name can change after get_last_sync()
+    tags = {"Device": GARMIN_DEVICENAME, "Database_Name": INFLUXDB_DATABASE, **extra_tags}
+    if TAG_MEASUREMENTS_WITH_USER_EMAIL:
+        tags['User_ID'] = garmin_obj.garth.profile.get('userName','Unknown')
+    return ",".join(f"{_lp_escape(key)}={_lp_escape(value)}" for key, value in sorted(tags.items()) if value)
+
+
 # %%
 def garmin_login():
     try:
@@ -179,90 +274,228 @@ def garmin_login():
             logging.error(str(err))
             raise Exception("Session is expired : please login again and restart the script")
 
+    # garth keeps one keep-alive requests.Session for all API calls; size its connection pool
+    # for the parallel per-day fetches so concurrent requests don't open throwaway connections
+    pool_size = max(10, MAX_CONCURRENT_FETCHES)
+    garmin.garth.configure(pool_connections=pool_size, pool_maxsize=pool_size)
+    garmin.garth.request = bounded_request(garmin.garth)
+    if GARMIN_RESPONSE_CACHE_DIR and MANUAL_START_DATE: # never for the periodic sync, whose recent dates must always be fresh
+        garmin.garth.connectapi = disk_cached_connectapi(garmin.garth.connectapi)
     return garmin
 
+def bounded_request(garth_client):
+    # Replaces garth.Client.request, which every Garmin call (connectapi and downloads) ends up in. garth keeps the response
+    # in the shared client.last_resp and returns that, so with requests in flight on several threads one could be handed
+    # another endpoint's response - this one returns the response it made itself. It also caps the requests in flight at
+    # MAX_CONCURRENT_FETCHES across all the thread pools. Only the request itself holds a slot, never a wait on other
+    # futures, and a request made while holding one (the OAuth2 token refresh) reuses it instead of deadlocking
+    def request(method, subdomain, path, /, api=False, referrer=False, headers={}, **kwargs):
+        if getattr(GARMIN_REQUEST_SLOT_HELD, 'value', False):
+            return send_request(method, subdomain, path, api, referrer, headers, **kwargs)
+        with GARMIN_REQUEST_SLOTS:
+            GARMIN_REQUEST_SLOT_HELD.value = True
+            try:
+                return send_request(method, subdomain, path, api, referrer, headers, **kwargs)
+            finally:
+                GARMIN_REQUEST_SLOT_HELD.value = False
+
+    def send_request(method, subdomain, path, api, referrer, headers, **kwargs):
+        # same steps as garth 0.5.3 Client.request, without touching client.last_resp
+        url = urljoin(f"https://{subdomain}.{garth_client.domain}", path)
+        headers = dict(headers)
+        if referrer is True and garth_client.last_resp:
+            headers["referer"] = garth_client.last_resp.url
+        if api:
+            assert garth_client.oauth1_token, "OAuth1 token is required for API requests"
+            with GARMIN_TOKEN_LOCK:
+                if not garth_client.oauth2_token or garth_client.oauth2_token.expired:
+                    garth_client.refresh_oauth2()
+            headers["Authorization"] = str(garth_client.oauth2_token)
+        resp = garth_client.sess.request(method, url, headers=headers, timeout=garth_client.timeout, **kwargs)
+        try:
+            resp.raise_for_status()
+        except requests.exceptions.HTTPError as err:
+            raise GarthHTTPError(msg="Error in request", error=err)
+        return resp
+    return request
+
+ISO_DATE_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+def disk_cached_connectapi(connectapi):
+    # Keeps each GET response in GARMIN_RESPONSE_CACHE_DIR, keyed by path and query parameters, and serves
+    # it from there for GARMIN_RESPONSE_CACHE_TTL_SECONDS - rerunning a backfill skips the dates already fetched
+    os.makedirs(GARMIN_RESPONSE_CACHE_DIR, exist_ok=True)
+    def cached_connectapi(path, method="GET", **kwargs):
+        if method != "GET":
+            return connectapi(path, method=method, **kwargs)
+        request_key = json.dumps([path, kwargs.get("params")], sort_keys=True, default=str)
+        # MANUAL_END_DATE defaults to today, whose responses are still partial - dates from today on are never cached
+        today_str = datetime.today().strftime("%Y-%m-%d")
+        if any(date_str >= today_str for date_str in ISO_DATE_PATTERN.findall(request_key)):
+            return connectapi(path, method=method, **kwargs)
+        cache_file = os.path.join(GARMIN_RESPONSE_CACHE_DIR, hashlib.sha1(request_key.encode()).hexdigest() + ".json")
+        try:
+            if time.time() - os.path.getmtime(cache_file) < GARMIN_RESPONSE_CACHE_TTL_SECONDS:
+                with open(cache_file, "rb") as f:
+                    return json.load(f)
+        except (OSError, ValueError): # missing, unreadable or truncated cache files are simply requested again
+            pass
+        response = connectapi(path, method=method, **kwargs)
+        if response: # empty payloads ({}, [], 204) may just not be synced yet, so they are requested again next time
+            try:
+                temp_file = f"{cache_file}.{os.getpid()}-{threading.get_ident()}.tmp"
+                with open(temp_file, "wb") as f:
+                    f.write(json.dumps(response).encode())
+                os.replace(temp_file, cache_file) # atomic, concurrent fetchers never read a partial file
+            except (OSError, TypeError) as err:
+                logging.warning(f"Unable to cache Garmin response for {path} : {err}")
+        return response
+    return cached_connectapi
+
 # %%
 def write_points_to_influxdb(points):
-    write_chunk_size = 20000
+    # Points are buffered and sent in batches of INFLUXDB_WRITE_BATCH_SIZE instead of one request per fetcher
+    # Any iterable is accepted and consumed incrementally, so the buffer never holds more than one batch
+    user_tag = {'User_ID': garmin_obj.garth.profile.get('userName','Unknown')} if TAG_MEASUREMENTS_WITH_USER_EMAIL else None
+    for item in points:
+        if user_tag and not isinstance(item, str): # line protocol rows already carry the tag, see _lp_tag_set
+            item['tags'].update(user_tag)
+        PENDING_POINTS.append(item)
+        if len(PENDING_POINTS) - PENDING_POINTS_KEPT['count'] >= INFLUXDB_WRITE_BATCH_SIZE:
+            flush_points_to_influxdb()
+
+def flush_points_to_influxdb():
+    if not PENDING_POINTS:
+        return
+    points = PENDING_POINTS[:]
+    PENDING_POINTS.clear()
     try:
-        if len(points) != 0:
-            if TAG_MEASUREMENTS_WITH_USER_EMAIL:
-                for item in points:
-                    item['tags'].update({'User_ID': garmin_obj.garth.profile.get('userName','Unknown')})
-            # Write in chunks - Issue reported for large activities data containing >20000 points - Error 413 : payload too large
-            for i in range(0, len(points), write_chunk_size):
-                if INFLUXDB_VERSION == '1':
-                    influxdbclient.write_points(points[i:i + write_chunk_size])
-                else:
-                    influxdbclient.write(record=points[i:i + write_chunk_size])
-            logging.info("Success : updated influxDB database with new points")
-    except (InfluxDBClientError, InfluxDBError) as err:
-        logging.error("Write failed : Unable to connect with database! " + str(err))
+        # Write in chunks - Issue reported for large activities data containing >20000 points - Error 413 : payload too large
+        # Garmin timestamps have at most second resolution, so second precision shortens every serialised line
+        if INFLUXDB_VERSION == '1':
+            if influxdb_udp_client: # only the dense intraday series go fire-and-forget, activity tracks and everything else stay on HTTP
+                send_lines_over_udp([item for item in points if _is_udp_row(item)])
+                points = [item for item in points if not _is_udp_row(item)]
+            lines = [item if isinstance(item, str) else make_line(item['measurement'], tags=item.get('tags'), fields=item.get('fields'), time=item.get('time'), precision='s') for item in points]
+            if lines:
+                influxdbclient.write_points(lines, time_precision='s', batch_size=INFLUXDB_WRITE_BATCH_SIZE, protocol='line')
+        else:
+            for i in range(0, len(points), INFLUXDB_WRITE_BATCH_SIZE):
+                influxdbclient.write(record=points[i:i + INFLUXDB_WRITE_BATCH_SIZE], write_precision='s')
+        logging.info(f"Success : updated influxDB database with {len(points)} new points")
+        PENDING_POINTS_KEPT['count'] = 0
+    except (InfluxDBClientError, InfluxDBServerError, InfluxDBError, requests.exceptions.RequestException) as err:
+        if is_rejected_write(err):
+            PENDING_POINTS_KEPT['count'] = 0
+            logging.error("Write failed : InfluxDB rejected the points! " + str(err))
+        else:
+            # back to the front of the buffer (keeping the write order) for the next flush - rewriting the batches that
+            # did get through only overwrites identical points. Capped, so a long outage neither grows the buffer without
+            # bound nor makes every later flush resend all of it
+            kept_points = points[-PENDING_POINTS_LIMIT:]
+            PENDING_POINTS[:0] = kept_points
+            PENDING_POINTS_KEPT['count'] = len(kept_points)
+            logging.error(f"Write failed : Unable to connect with database, keeping {len(kept_points)} points for the next write! " + str(err))
+            if len(kept_points) < len(points):
+                logging.error(f"Write failed : dropped the {len(points) - len(kept_points)} oldest points, more than {PENDING_POINTS_LIMIT} are waiting to be written")
+
+def is_rejected_write(err):
+    # 4xx : the points themselves were refused (e.g. malformed), writing them again can't succeed
+    status_code = getattr(err, 'code', None) or getattr(getattr(err, 'response', None), 'status', None)
+    return isinstance(status_code, int) and 400 <= status_code < 500
+
+# Measurements INFLUXDB_UDP_PORT applies to - all of them are written as line protocol rows by their fetchers
+UDP_MEASUREMENTS = frozenset({"HeartRateIntraday", "StepsIntraday", "StressIntraday", "BodyBatteryIntraday", "BreathingRateIntraday", "HRV_Intraday", "SleepIntraday"})
+
+def _is_udp_row(item):
+    return isinstance(item, str) and item.split(",", 1)[0] in UDP_MEASUREMENTS
+
+def send_lines_over_udp(lines):
+    # Packs line protocol rows into datagrams of at most INFLUXDB_UDP_PACKET_BYTES, nothing is acknowledged
+    packet, packet_bytes = [], 0
+    try:
+        for line in lines:
+            line_bytes = len(line.encode()) + 1 # newline separator
+            if packet and packet_bytes + line_bytes > INFLUXDB_UDP_PACKET_BYTES:
+                influxdb_udp_client.send_packet(packet, protocol='line')
+                packet, packet_bytes = [], 0
+            packet.append(line)
+            packet_bytes += line_bytes
+        if packet:
+            influxdb_udp_client.send_packet(packet, protocol='line')
+    except OSError as err:
+        logging.error("UDP write failed : Unable to send intraday points to the influxDB UDP listener! " + str(err))
+        return
+    if lines:
+        logging.info(f"Success : sent {len(lines)} intraday points to the influxDB UDP listener")
 
 # %%
+# DailyStats fields, copied as-is from the get_stats response
+DAILY_STATS_FIELDS = (
+    "activeKilocalories",
+    "bmrKilocalories",
+
+    "totalSteps",
+    "totalDistanceMeters",
+
+    "highlyActiveSeconds",
+    "activeSeconds",
+    "sedentarySeconds",
+    "sleepingSeconds",
+    "moderateIntensityMinutes",
+    "vigorousIntensityMinutes",
+
+    "floorsAscendedInMeters",
+    "floorsDescendedInMeters",
+    "floorsAscended",
+    "floorsDescended",
+
+    "minHeartRate",
+    "maxHeartRate",
+    "restingHeartRate",
+    "minAvgHeartRate",
+    "maxAvgHeartRate",
+
+    "stressDuration",
+    "restStressDuration",
+    "activityStressDuration",
+    "uncategorizedStressDuration",
+    "totalStressDuration",
+    "lowStressDuration",
+    "mediumStressDuration",
+    "highStressDuration",
+
+    "stressPercentage",
+    "restStressPercentage",
+    "activityStressPercentage",
+    "uncategorizedStressPercentage",
+    "lowStressPercentage",
+    "mediumStressPercentage",
+    "highStressPercentage",
+
+    "bodyBatteryChargedValue",
+    "bodyBatteryDrainedValue",
+    "bodyBatteryHighestValue",
+    "bodyBatteryLowestValue",
+    "bodyBatteryDuringSleep",
+    "bodyBatteryAtWakeTime",
+
+    "averageSpo2",
+    "lowestSpo2",
+)
+
 def get_daily_stats(date_str):
     points_list = []
-    stats_json = garmin_obj.get_stats(date_str)
-    if stats_json['wellnessStartTimeGmt'] and datetime.strptime(date_str, "%Y-%m-%d") < datetime.today():
+    stats_json = cached_stats(garmin_obj, date_str) # shared with get_training_load and the custom metrics
+    if stats_json['wellnessStartTimeGmt'] and datetime.strptime(date_str, "%Y-%m-%d") < FETCH_TODAY:
         points_list.append({
             "measurement":  "DailyStats",
-            "time": pytz.timezone("UTC").localize(datetime.strptime(stats_json['wellnessStartTimeGmt'], "%Y-%m-%dT%H:%M:%S.%f")).isoformat(),
+            "time": _parse_gmt(stats_json['wellnessStartTimeGmt']),
             "tags": {
                 "Device": GARMIN_DEVICENAME,
                 "Database_Name": INFLUXDB_DATABASE
             },
-            "fields": {
-                "activeKilocalories": stats_json.get('activeKilocalories'),
-                "bmrKilocalories": stats_json.get('bmrKilocalories'),
-
-                'totalSteps': stats_json.get('totalSteps'),
-                'totalDistanceMeters': stats_json.get('totalDistanceMeters'),
-
-                "highlyActiveSeconds": stats_json.get("highlyActiveSeconds"),
-                "activeSeconds": stats_json.get("activeSeconds"),
-                "sedentarySeconds": stats_json.get("sedentarySeconds"),
-                "sleepingSeconds": stats_json.get("sleepingSeconds"),
-                "moderateIntensityMinutes": stats_json.get("moderateIntensityMinutes"),
-                "vigorousIntensityMinutes": stats_json.get("vigorousIntensityMinutes"),
-
-                "floorsAscendedInMeters": stats_json.get("floorsAscendedInMeters"),
-                "floorsDescendedInMeters": stats_json.get("floorsDescendedInMeters"),
-                "floorsAscended": stats_json.get("floorsAscended"),
-                "floorsDescended": stats_json.get("floorsDescended"),
-
-                "minHeartRate": stats_json.get("minHeartRate"),
-                "maxHeartRate": stats_json.get("maxHeartRate"),
-                "restingHeartRate": stats_json.get("restingHeartRate"),
-                "minAvgHeartRate": stats_json.get("minAvgHeartRate"),
-                "maxAvgHeartRate": stats_json.get("maxAvgHeartRate"),
-                
-                "stressDuration": stats_json.get("stressDuration"),
-                "restStressDuration": stats_json.get("restStressDuration"),
-                "activityStressDuration": stats_json.get("activityStressDuration"),
-                "uncategorizedStressDuration": stats_json.get("uncategorizedStressDuration"),
-                "totalStressDuration": stats_json.get("totalStressDuration"),
-                "lowStressDuration": stats_json.get("lowStressDuration"),
-                "mediumStressDuration": stats_json.get("mediumStressDuration"),
-                "highStressDuration": stats_json.get("highStressDuration"),
-                
-                "stressPercentage": stats_json.get("stressPercentage"),
-                "restStressPercentage": stats_json.get("restStressPercentage"),
-                "activityStressPercentage": stats_json.get("activityStressPercentage"),
-                "uncategorizedStressPercentage": stats_json.get("uncategorizedStressPercentage"),
-                "lowStressPercentage": stats_json.get("lowStressPercentage"),
-                "mediumStressPercentage": stats_json.get("mediumStressPercentage"),
-                "highStressPercentage": stats_json.get("highStressPercentage"),
-                
-                "bodyBatteryChargedValue": stats_json.get("bodyBatteryChargedValue"),
-                "bodyBatteryDrainedValue": stats_json.get("bodyBatteryDrainedValue"),
-                "bodyBatteryHighestValue": stats_json.get("bodyBatteryHighestValue"),
-                "bodyBatteryLowestValue": stats_json.get("bodyBatteryLowestValue"),
-                "bodyBatteryDuringSleep": stats_json.get("bodyBatteryDuringSleep"),
-                "bodyBatteryAtWakeTime": stats_json.get("bodyBatteryAtWakeTime"),
-                
-                "averageSpo2": stats_json.get("averageSpo2"),
-                "lowestSpo2": stats_json.get("lowestSpo2"),
-            }
+            "fields": {field: stats_json.get(field) for field in DAILY_STATS_FIELDS}
         })
         if points_list:
             logging.info(f"Success : Fetching daily metrics for date {date_str}")
@@ -273,17 +506,25 @@ def get_daily_stats(date_str):
     
 
 # %%
+def get_device_last_used():
+    # The watch-sync poll of the main loop and get_last_sync() at the start of the fetch_write_bulk it triggers share
+    # one request - kept for half an update interval, so the next poll always asks Garmin again
+    now = time.monotonic()
+    if DEVICE_LAST_USED['ts'] is None or now - DEVICE_LAST_USED['ts'] > UPDATE_INTERVAL_SECONDS / 2:
+        DEVICE_LAST_USED.update(ts=now, val=garmin_obj.get_device_last_used())
+    return DEVICE_LAST_USED['val']
+
 def get_last_sync():
     global GARMIN_DEVICENAME
     global GARMIN_DEVICEID
     points_list = []
-    sync_data = garmin_obj.get_device_last_used()
+    sync_data = get_device_last_used()
     if GARMIN_DEVICENAME_AUTOMATIC:
         GARMIN_DEVICENAME = sync_data.get('lastUsedDeviceName') or "Unknown"
         GARMIN_DEVICEID = sync_data.get('userDeviceId') or None
     points_list.append({
         "measurement":  "DeviceSync",
-        "time": datetime.fromtimestamp(sync_data['lastUsedDeviceUploadTime']/1000, tz=pytz.timezone("UTC")).isoformat(),
+        "time": datetime.fromtimestamp(sync_data['lastUsedDeviceUploadTime']/1000, tz=UTC).isoformat(),
         "tags": {
             "Device": GARMIN_DEVICENAME,
             "Database_Name": INFLUXDB_DATABASE
@@ -300,18 +541,27 @@ def get_last_sync():
     return points_list
 
 # %%
+# (response key, millisecond epoch key, value key, SleepIntraday field) of the sleep series with one value per sample
+SLEEP_INTRADAY_SERIES = (
+    ("sleepRestlessMoments", "startGMT", "value", "sleepRestlessValue"),
+    ("wellnessEpochRespirationDataDTOList", "startTimeGMT", "respirationValue", "respirationValue"),
+    ("sleepHeartRate", "startGMT", "value", "heartRate"),
+    ("sleepStress", "startGMT", "value", "stressValue"),
+    ("sleepBodyBattery", "startGMT", "value", "bodyBattery"),
+    ("hrvData", "startGMT", "value", "hrvData"),
+)
+
 def get_sleep_data(date_str):
     points_list = []
-    all_sleep_data = garmin_obj.get_sleep_data(date_str)
+    device_tags = {"Device": GARMIN_DEVICENAME, "Database_Name": INFLUXDB_DATABASE} # one dict shared by all points of the day - the client only reads tags when serialising
+    tag_set = _lp_tag_set() # the single-value series below are written as line protocol rows with integer-second timestamps, see get_intraday_hr
+    all_sleep_data = cached_sleep(garmin_obj, date_str) # shared with get_readiness_inputs
     sleep_json = all_sleep_data.get("dailySleepDTO", None)
     if sleep_json["sleepEndTimestampGMT"]:
         points_list.append({
         "measurement":  "SleepSummary",
-        "time": datetime.fromtimestamp(sleep_json["sleepEndTimestampGMT"]/1000, tz=pytz.timezone("UTC")).isoformat(),
-        "tags": {
-            "Device": GARMIN_DEVICENAME,
-            "Database_Name": INFLUXDB_DATABASE
-            },
+        "time": datetime.fromtimestamp(sleep_json["sleepEndTimestampGMT"]/1000, tz=UTC).isoformat(),
+        "tags": device_tags,
         "fields": {
             "sleepTimeSeconds": sleep_json.get("sleepTimeSeconds"),
             "deepSleepSeconds": sleep_json.get("deepSleepSeconds"),
@@ -336,269 +586,95 @@ def get_sleep_data(date_str):
     sleep_movement_intraday = all_sleep_data.get("sleepMovement")
     if sleep_movement_intraday:
         for entry in sleep_movement_intraday:
+            start_dt = _gmt_datetime(entry["startGMT"])
+            end_dt = _gmt_datetime(entry["endGMT"])
             points_list.append({
                 "measurement":  "SleepIntraday",
-                "time": pytz.timezone("UTC").localize(datetime.strptime(entry["startGMT"], "%Y-%m-%dT%H:%M:%S.%f")).isoformat(),
-                "tags": {
-                    "Device": GARMIN_DEVICENAME,
-                    "Database_Name": INFLUXDB_DATABASE
-                },
+                "time": start_dt.isoformat(),
+                "tags": device_tags,
                 "fields": {
                     "SleepMovementActivityLevel": entry.get("activityLevel",-1),
-                    "SleepMovementActivitySeconds": int((datetime.strptime(entry["endGMT"], "%Y-%m-%dT%H:%M:%S.%f") - datetime.strptime(entry["startGMT"], "%Y-%m-%dT%H:%M:%S.%f")).total_seconds())
+                    "SleepMovementActivitySeconds": int((end_dt - start_dt).total_seconds())
                 }
             })
     sleep_levels_intraday = all_sleep_data.get("sleepLevels")
     if sleep_levels_intraday:
         for entry in sleep_levels_intraday:
             if entry.get("activityLevel") or entry.get("activityLevel") == 0: # Include 0 for Deepsleep but not None - Refer to issue #43
+                start_dt = _gmt_datetime(entry["startGMT"])
+                end_dt = _gmt_datetime(entry["endGMT"])
                 points_list.append({
                     "measurement":  "SleepIntraday",
-                    "time": pytz.timezone("UTC").localize(datetime.strptime(entry["startGMT"], "%Y-%m-%dT%H:%M:%S.%f")).isoformat(),
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME,
-                        "Database_Name": INFLUXDB_DATABASE
-                    },
+                    "time": start_dt.isoformat(),
+                    "tags": device_tags,
                     "fields": {
                         "SleepStageLevel": entry.get("activityLevel"),
-                        "SleepStageSeconds": int((datetime.strptime(entry["endGMT"], "%Y-%m-%dT%H:%M:%S.%f") - datetime.strptime(entry["startGMT"], "%Y-%m-%dT%H:%M:%S.%f")).total_seconds())
+                        "SleepStageSeconds": int((end_dt - start_dt).total_seconds())
                     }
                 })
         # Add additional duplicate terminal data point (see issue #127)
         if entry.get("endGMT"):
             points_list.append({
                 "measurement":  "SleepIntraday",
-                "time": pytz.timezone("UTC").localize(datetime.strptime(entry["endGMT"], "%Y-%m-%dT%H:%M:%S.%f")).isoformat(),
-                "tags": {
-                    "Device": GARMIN_DEVICENAME,
-                    "Database_Name": INFLUXDB_DATABASE
-                },
+                "time": _parse_gmt(entry["endGMT"]),
+                "tags": device_tags,
                 "fields": {"SleepStageLevel": entry.get("activityLevel")} # Duplicating last entry for visualization in Grafana
             })
-    sleep_restlessness_intraday = all_sleep_data.get("sleepRestlessMoments")
-    if sleep_restlessness_intraday:
-        for entry in sleep_restlessness_intraday:
-            if entry.get("value"):
-                points_list.append({
-                    "measurement":  "SleepIntraday",
-                    "time": datetime.fromtimestamp(entry["startGMT"]/1000, tz=pytz.timezone("UTC")).isoformat(),
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME,
-                        "Database_Name": INFLUXDB_DATABASE
-                    },
-                    "fields": {
-                        "sleepRestlessValue": entry.get("value")
-                    }
-                })
-    sleep_spo2_intraday = all_sleep_data.get("wellnessEpochSPO2DataDTOList")
-    if sleep_spo2_intraday:
-        for entry in sleep_spo2_intraday:
-            if entry.get("spo2Reading"):
-                points_list.append({
-                    "measurement":  "SleepIntraday",
-                    "time": pytz.timezone("UTC").localize(datetime.strptime(entry["epochTimestamp"], "%Y-%m-%dT%H:%M:%S.%f")).isoformat(),
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME,
-                        "Database_Name": INFLUXDB_DATABASE
-                    },
-                    "fields": {
-                        "spo2Reading": entry.get("spo2Reading")
-                    }
-                })
-    sleep_respiration_intraday = all_sleep_data.get("wellnessEpochRespirationDataDTOList")
-    if sleep_respiration_intraday:
-        for entry in sleep_respiration_intraday:
-            if entry.get("respirationValue"):
-                points_list.append({
-                    "measurement":  "SleepIntraday",
-                    "time": datetime.fromtimestamp(entry["startTimeGMT"]/1000, tz=pytz.timezone("UTC")).isoformat(),
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME,
-                        "Database_Name": INFLUXDB_DATABASE
-                    },
-                    "fields": {
-                        "respirationValue": entry.get("respirationValue")
-                    }
-                })
-    sleep_heart_rate_intraday = all_sleep_data.get("sleepHeartRate")
-    if sleep_heart_rate_intraday:
-        for entry in sleep_heart_rate_intraday:
-            if entry.get("value"):
-                points_list.append({
-                    "measurement":  "SleepIntraday",
-                    "time": datetime.fromtimestamp(entry["startGMT"]/1000, tz=pytz.timezone("UTC")).isoformat(),
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME,
-                        "Database_Name": INFLUXDB_DATABASE
-                    },
-                    "fields": {
-                        "heartRate": entry.get("value")
-                    }
-                })
-    sleep_stress_intraday = all_sleep_data.get("sleepStress")
-    if sleep_stress_intraday:
-        for entry in sleep_stress_intraday:
-            if entry.get("value"):
-                points_list.append({
-                    "measurement":  "SleepIntraday",
-                    "time": datetime.fromtimestamp(entry["startGMT"]/1000, tz=pytz.timezone("UTC")).isoformat(),
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME,
-                        "Database_Name": INFLUXDB_DATABASE
-                    },
-                    "fields": {
-                        "stressValue": entry.get("value")
-                    }
-                })
-    sleep_bb_intraday = all_sleep_data.get("sleepBodyBattery")
-    if sleep_bb_intraday:
-        for entry in sleep_bb_intraday:
-            if entry.get("value"):
-                points_list.append({
-                    "measurement":  "SleepIntraday",
-                    "time": datetime.fromtimestamp(entry["startGMT"]/1000, tz=pytz.timezone("UTC")).isoformat(),
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME,
-                        "Database_Name": INFLUXDB_DATABASE
-                    },
-                    "fields": {
-                        "bodyBattery": entry.get("value")
-                    }
-                })
-    sleep_hrv_intraday = all_sleep_data.get("hrvData")
-    if sleep_hrv_intraday:
-        for entry in sleep_hrv_intraday:
-            if entry.get("value"):
-                points_list.append({
-                    "measurement":  "SleepIntraday",
-                    "time": datetime.fromtimestamp(entry["startGMT"]/1000, tz=pytz.timezone("UTC")).isoformat(),
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME,
-                        "Database_Name": INFLUXDB_DATABASE
-                    },
-                    "fields": {
-                        "hrvData": entry.get("value")
-                    }
-                })
+    points_list += [f"SleepIntraday,{tag_set} spo2Reading={_lp_field(entry['spo2Reading'])} {int(_gmt_datetime(entry['epochTimestamp']).timestamp())}"
+                    for entry in all_sleep_data.get("wellnessEpochSPO2DataDTOList") or [] if entry.get("spo2Reading")]
+    for series_key, time_key, value_key, field_name in SLEEP_INTRADAY_SERIES:
+        points_list += [f"SleepIntraday,{tag_set} {field_name}={_lp_field(entry[value_key])} {entry[time_key] // 1000}"
+                        for entry in all_sleep_data.get(series_key) or [] if entry.get(value_key)]
     if points_list:
         logging.info(f"Success : Fetching intraday sleep metrics for date {date_str}")
     return points_list
 
 # %%
 def get_intraday_hr(date_str):
-    points_list = []
-    hr_list = garmin_obj.get_heart_rates(date_str).get("heartRateValues") or []
-    for entry in hr_list:
-        if entry[1]:
-            points_list.append({
-                    "measurement":  "HeartRateIntraday",
-                    "time": datetime.fromtimestamp(entry[0]/1000, tz=pytz.timezone("UTC")).isoformat(),
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME,
-                        "Database_Name": INFLUXDB_DATABASE
-                    },
-                    "fields": {
-                        "HeartRate": entry[1]
-                    }
-                })
+    tag_set = _lp_tag_set()
+    hr_list = cached_heart_rates(garmin_obj, date_str).get("heartRateValues") or []
+    points_list = [f"HeartRateIntraday,{tag_set} HeartRate={_lp_field(entry[1])} {entry[0] // 1000}" for entry in hr_list if entry[1]]
     if points_list:
         logging.info(f"Success : Fetching intraday Heart Rate for date {date_str}")
     return points_list
 
 # %%
 def get_intraday_steps(date_str):
-    points_list = []
+    tag_set = _lp_tag_set()
     steps_list = garmin_obj.get_steps_data(date_str)
-    for entry in steps_list:
-        if entry["steps"] or entry["steps"] == 0:
-            points_list.append({
-                    "measurement":  "StepsIntraday",
-                    "time": pytz.timezone("UTC").localize(datetime.strptime(entry['startGMT'], "%Y-%m-%dT%H:%M:%S.%f")).isoformat(),
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME,
-                        "Database_Name": INFLUXDB_DATABASE
-                    },
-                    "fields": {
-                        "StepsCount": entry["steps"]
-                    }
-                })
+    points_list = [f"StepsIntraday,{tag_set} StepsCount={_lp_field(entry['steps'])} {int(_gmt_datetime(entry['startGMT']).timestamp())}"
+                   for entry in steps_list if entry["steps"] or entry["steps"] == 0]
     if points_list:
         logging.info(f"Success : Fetching intraday steps for date {date_str}")
     return points_list
 
 # %%
 def get_intraday_stress(date_str):
-    points_list = []
-    stress_list = garmin_obj.get_stress_data(date_str).get('stressValuesArray') or []
-    for entry in stress_list:
-        if entry[1] or entry[1] == 0:
-            points_list.append({
-                    "measurement":  "StressIntraday",
-                    "time": datetime.fromtimestamp(entry[0]/1000, tz=pytz.timezone("UTC")).isoformat(),
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME,
-                        "Database_Name": INFLUXDB_DATABASE
-                    },
-                    "fields": {
-                        "stressLevel": entry[1]
-                    }
-                })
-    bb_list = garmin_obj.get_stress_data(date_str).get('bodyBatteryValuesArray') or []
-    for entry in bb_list:
-        if entry[2] or entry[2] == 0:
-            points_list.append({
-                    "measurement":  "BodyBatteryIntraday",
-                    "time": datetime.fromtimestamp(entry[0]/1000, tz=pytz.timezone("UTC")).isoformat(),
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME,
-                        "Database_Name": INFLUXDB_DATABASE
-                    },
-                    "fields": {
-                        "BodyBatteryLevel": entry[2]
-                    }
-                })
+    tag_set = _lp_tag_set()
+    stress_json = garmin_obj.get_stress_data(date_str) or {}
+    stress_list = stress_json.get('stressValuesArray') or []
+    points_list = [f"StressIntraday,{tag_set} stressLevel={_lp_field(entry[1])} {entry[0] // 1000}" for entry in stress_list if entry[1] or entry[1] == 0]
+    bb_list = stress_json.get('bodyBatteryValuesArray') or []
+    points_list += [f"BodyBatteryIntraday,{tag_set} BodyBatteryLevel={_lp_field(entry[2])} {entry[0] // 1000}" for entry in bb_list if entry[2] or entry[2] == 0]
     if points_list:
         logging.info(f"Success : Fetching intraday stress and Body Battery values for date {date_str}")
     return points_list
 
 # %%
 def get_intraday_br(date_str):
-    points_list = []
+    tag_set = _lp_tag_set()
     br_list = garmin_obj.get_respiration_data(date_str).get('respirationValuesArray') or []
-    for entry in br_list:
-        if entry[1]:
-            points_list.append({
-                    "measurement":  "BreathingRateIntraday",
-                    "time": datetime.fromtimestamp(entry[0]/1000, tz=pytz.timezone("UTC")).isoformat(),
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME,
-                        "Database_Name": INFLUXDB_DATABASE
-                    },
-                    "fields": {
-                        "BreathingRate": entry[1]
-                    }
-                })
+    points_list = [f"BreathingRateIntraday,{tag_set} BreathingRate={_lp_field(entry[1])} {entry[0] // 1000}" for entry in br_list if entry[1]]
     if points_list:
         logging.info(f"Success : Fetching intraday Breathing Rate for date {date_str}")
     return points_list
 
 # %%
 def get_intraday_hrv(date_str):
-    points_list = []
+    tag_set = _lp_tag_set()
     hrv_list = (garmin_obj.get_hrv_data(date_str) or {}).get('hrvReadings') or []
-    for entry in hrv_list:
-        if entry.get('hrvValue'):
-            points_list.append({
-                    "measurement":  "HRV_Intraday",
-                    "time": pytz.timezone("UTC").localize(datetime.strptime(entry['readingTimeGMT'],"%Y-%m-%dT%H:%M:%S.%f")).isoformat(),
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME,
-                        "Database_Name": INFLUXDB_DATABASE
-                    },
-                    "fields": {
-                        "hrvValue": entry.get('hrvValue')
-                    }
-                })
+    points_list = [f"HRV_Intraday,{tag_set} hrvValue={_lp_field(entry['hrvValue'])} {int(_gmt_datetime(entry['readingTimeGMT']).timestamp())}"
+                   for entry in hrv_list if entry.get('hrvValue')]
     if points_list:
         logging.info(f"Success : Fetching intraday HRV for date {date_str}")
     return points_list
@@ -606,7 +682,7 @@ def get_intraday_hrv(date_str):
 # %%
 def get_body_composition(date_str):
     points_list = []
-    weight_list_all = garmin_obj.get_weigh_ins(date_str, date_str).get('dailyWeightSummaries', [])
+    weight_list_all = cached_weigh_ins(garmin_obj, date_str).get('dailyWeightSummaries', []) # shared with get_activity_vo2
     if weight_list_all:
         weight_list = weight_list_all[0].get('allWeightMetrics', [])
         for weight_dict in weight_list:
@@ -619,12 +695,12 @@ def get_body_composition(date_str):
                     "muscleMass": weight_dict.get("muscleMass"),
                     "physiqueRating": weight_dict.get("physiqueRating"),
                     "visceralFat": weight_dict.get("visceralFat"),
-                    # "metabolicAge": datetime.fromtimestamp(int(weight_dict.get("metabolicAge")/1000), tz=pytz.timezone("UTC")).isoformat() if weight_dict.get("metabolicAge") else None
+                    # "metabolicAge": datetime.fromtimestamp(int(weight_dict.get("metabolicAge")/1000), tz=UTC).isoformat() if weight_dict.get("metabolicAge") else None
                 }
             if not all(value is None for value in data_fields.values()):
                 points_list.append({
                     "measurement":  "BodyComposition",
-                    "time": datetime.fromtimestamp((weight_dict['timestampGMT']/1000) , tz=pytz.timezone("UTC")).isoformat() if weight_dict['timestampGMT'] else datetime.strptime(date_str, "%Y-%m-%d").replace(hour=0, tzinfo=pytz.UTC).isoformat(), # Use GMT 00:00 is timestamp is not available (issue #15)
+                    "time": datetime.fromtimestamp((weight_dict['timestampGMT']/1000) , tz=UTC).isoformat() if weight_dict['timestampGMT'] else utc_midnight(date_str).isoformat(), # Use GMT 00:00 is timestamp is not available (issue #15)
                     "tags": {
                         "Device": GARMIN_DEVICENAME,
                         "Database_Name": INFLUXDB_DATABASE,
@@ -640,27 +716,28 @@ def get_body_composition(date_str):
 def get_activity_summary(date_str):
     points_list = []
     activity_with_gps_id_dict = {}
-    activity_list = garmin_obj.get_activities_by_date(date_str, date_str)
+    activity_list = cached_activities(garmin_obj, date_str)
     for activity in activity_list:
         if activity.get('hasPolyline') or ALWAYS_PROCESS_FIT_FILES: # will process FIT files lacking GPS data if ALWAYS_PROCESS_FIT_FILES is set to True
             if not activity.get('hasPolyline'):
                 logging.warning(f"Activity ID {activity.get('activityId')} got no GPS data - yet, activity FIT file data will be processed as ALWAYS_PROCESS_FIT_FILES is on")
             activity_with_gps_id_dict[activity.get('activityId')] = (activity.get('activityType') or {}).get('typeKey', "Unknown")
         if "startTimeGMT" in activity: # "startTimeGMT" should be available for all activities (fix #13)
-            start = datetime.strptime(activity["startTimeGMT"], "%Y-%m-%d %H:%M:%S").replace(tzinfo=pytz.UTC)
+            start = _gmt_datetime(activity["startTimeGMT"]) # "%Y-%m-%d %H:%M:%S" is ISO 8601 with a space separator - parsed once, reused for both points below
             duration = int(activity.get('elapsedDuration', 0))
             end = start + timedelta(seconds=duration)
+            activity_selector = start.strftime('%Y%m%dT%H%M%SUTC-') + (activity.get('activityType') or {}).get('typeKey', "Unknown")
 
             trimp = get_training_load(garmin_obj, date_str, start, end)
 
             points_list.append({
                 "measurement":  "ActivitySummary",
-                "time": datetime.strptime(activity["startTimeGMT"], "%Y-%m-%d %H:%M:%S").replace(tzinfo=pytz.UTC).isoformat(),
+                "time": start.isoformat(),
                 "tags": {
                     "Device": GARMIN_DEVICENAME,
                     "Database_Name": INFLUXDB_DATABASE,
                     "ActivityID": activity.get('activityId'),
-                    "ActivitySelector": datetime.strptime(activity["startTimeGMT"], "%Y-%m-%d %H:%M:%S").replace(tzinfo=pytz.UTC).strftime('%Y%m%dT%H%M%SUTC-') + (activity.get('activityType') or {}).get('typeKey', "Unknown")
+                    "ActivitySelector": activity_selector
                 },
                 "fields": {
                     "Activity_ID": activity.get('activityId'),
@@ -688,12 +765,12 @@ def get_activity_summary(date_str):
             })
             points_list.append({
                 "measurement":  "ActivitySummary",
-                "time": (datetime.strptime(activity["startTimeGMT"], "%Y-%m-%d %H:%M:%S").replace(tzinfo=pytz.UTC) + timedelta(seconds=int(activity.get('elapsedDuration', 0)))).isoformat(),
+                "time": end.isoformat(),
                 "tags": {
                     "Device": GARMIN_DEVICENAME,
                     "Database_Name": INFLUXDB_DATABASE,
                     "ActivityID": activity.get('activityId'),
-                    "ActivitySelector": datetime.strptime(activity["startTimeGMT"], "%Y-%m-%d %H:%M:%S").replace(tzinfo=pytz.UTC).strftime('%Y%m%dT%H%M%SUTC-') + (activity.get('activityType') or {}).get('typeKey', "Unknown")
+                    "ActivitySelector": activity_selector
                 },
                 "fields": {
                     "Activity_ID": activity.get('activityId'),
@@ -708,8 +785,44 @@ def get_activity_summary(date_str):
     return points_list, activity_with_gps_id_dict
 
 # %%
+_TCX = "{%s}" % TCX_NS["tcx"]
+TCX_ACTIVITY_TAG = f"{_TCX}Activity"
+TCX_LAP_TAG = f"{_TCX}Lap"
+TCX_ID_TAG = f"{_TCX}Id"
+# Clark-notation Trackpoint child paths, no per-call namespace prefix expansion in findtext()
+TCX_LAT_PATH = f"{_TCX}Position/{_TCX}LatitudeDegrees"
+TCX_LON_PATH = f"{_TCX}Position/{_TCX}LongitudeDegrees"
+TCX_ALT_PATH = f"{_TCX}AltitudeMeters"
+TCX_DIST_PATH = f"{_TCX}DistanceMeters"
+
+def _float_or_none(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _tcx_float_column(values):
+    # One C-level cast for a whole Trackpoint value column instead of a try/except per value - missing values
+    # come back as None. Only a column holding unparseable text falls back to per-value parsing
+    try:
+        column = np.array(["nan" if value is None else value for value in values], dtype=np.float64)
+    except ValueError:
+        return [_float_or_none(value) for value in values]
+    return [None if value != value else value for value in column.tolist()]
+
 def fetch_activity_GPS(activityIDdict): # Uses FIT file by default, falls back to TCX
     points_list = []
+    # The day's FIT downloads are requested concurrently up front, parsing below stays sequential. The loop stops at
+    # the first activity already processed within the current runtime, so nothing after it is downloaded
+    download_ids = []
+    for activityID in activityIDdict:
+        if (activityID in PARSED_ACTIVITY_ID_LIST) and (not FORCE_REPROCESS_ACTIVITIES):
+            break
+        download_ids.append(activityID)
+    download_pool = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_FETCHES)
+    fit_downloads = {activityID: download_pool.submit(garmin_obj.download_activity, activityID, dl_fmt=garmin_obj.ActivityDownloadFormat.ORIGINAL)
+                     for activityID in download_ids}
+    download_pool.shutdown(wait=False) # submitted downloads still complete
     for activityID in activityIDdict.keys():
         activity_type = activityIDdict[activityID]
         if (activityID in PARSED_ACTIVITY_ID_LIST) and (not FORCE_REPROCESS_ACTIVITIES):
@@ -718,7 +831,7 @@ def fetch_activity_GPS(activityIDdict): # Uses FIT file by default, falls back t
         if (activityID in PARSED_ACTIVITY_ID_LIST) and (FORCE_REPROCESS_ACTIVITIES):
             logging.info(f"Re-processing : Activity ID {activityID} (FORCE_REPROCESS_ACTIVITIES is on)")
         try:
-            zip_data = garmin_obj.download_activity(activityID, dl_fmt=garmin_obj.ActivityDownloadFormat.ORIGINAL)
+            zip_data = fit_downloads[activityID].result()
             logging.info(f"Processing : Activity ID {activityID} FIT file data - this may take a while...")
             zip_buffer = io.BytesIO(zip_data)
             with zipfile.ZipFile(zip_buffer) as zip_ref:
@@ -737,38 +850,31 @@ def fetch_activity_GPS(activityIDdict): # Uses FIT file by default, falls back t
                     if len(all_records_list) == 0:
                         raise FileNotFoundError(f"No records found in FIT file for Activity ID {activityID} - Discarding FIT file")
                     else:
-                        activity_start_time = all_records_list[0]['timestamp'].replace(tzinfo=pytz.UTC)
+                        activity_start_time = all_records_list[0]['timestamp'].replace(tzinfo=UTC)
+                        activity_selector = activity_start_time.strftime('%Y%m%dT%H%M%SUTC-') + activity_type
+                        # records are the bulk of an activity's points - written as line protocol rows sharing one escaped tag set
+                        record_tag_set = _lp_tag_set(ActivityID=activityID, ActivitySelector=activity_selector)
                     for parsed_record in all_records_list:
                         if parsed_record.get('timestamp'):
-                            point = {
-                                "measurement": "ActivityGPS",
-                                "time": parsed_record['timestamp'].replace(tzinfo=pytz.UTC).isoformat(),
-                                "tags": {
-                                    "Device": GARMIN_DEVICENAME,
-                                    "Database_Name": INFLUXDB_DATABASE,
-                                    "ActivityID": activityID,
-                                    "ActivitySelector": activity_start_time.strftime('%Y%m%dT%H%M%SUTC-') + activity_type
-                                },
-                                "fields": {
-                                    "ActivityName": activity_type,
-                                    "Activity_ID": activityID,
-                                    "Latitude": int(parsed_record['position_lat']) * ( 180 / 2**31 ) if parsed_record.get('position_lat') else None,
-                                    "Longitude": int(parsed_record['position_long']) * ( 180 / 2**31 ) if parsed_record.get('position_long') else None,
-                                    "Altitude": parsed_record.get('enhanced_altitude', None) or parsed_record.get('altitude', None),
-                                    "Distance": parsed_record.get('distance', None),
-                                    "DurationSeconds": (parsed_record['timestamp'].replace(tzinfo=pytz.UTC) - activity_start_time).total_seconds(),
-                                    "HeartRate": float(parsed_record.get('heart_rate', None)) if parsed_record.get('heart_rate', None) else None,
-                                    "Speed": parsed_record.get('enhanced_speed', None) or parsed_record.get('speed', None),
-                                    "GradeAdjustedSpeed": (parsed_record.get("unknown_140") / 1000.0) if parsed_record.get("unknown_140") else None,
-                                    "RunningEfficiency": ((parsed_record.get("unknown_140") / 1000.0)/parsed_record.get('heart_rate')) if (parsed_record.get("unknown_140") and parsed_record.get('heart_rate')) else None,
-                                    "Cadence": parsed_record.get('cadence', None),
-                                    "Fractional_Cadence": parsed_record.get('fractional_cadence', None),
-                                    "Temperature": parsed_record.get('temperature', None),
-                                    "Accumulated_Power": parsed_record.get('accumulated_power', None),
-                                    "Power": parsed_record.get('power', None)
-                                }
-                            }
-                            points_list.append(point)
+                            record_time = parsed_record['timestamp'].replace(tzinfo=UTC)
+                            points_list.append(_lp_row("ActivityGPS", record_tag_set, {
+                                "ActivityName": activity_type,
+                                "Activity_ID": activityID,
+                                "Latitude": int(parsed_record['position_lat']) * ( 180 / 2**31 ) if parsed_record.get('position_lat') else None,
+                                "Longitude": int(parsed_record['position_long']) * ( 180 / 2**31 ) if parsed_record.get('position_long') else None,
+                                "Altitude": parsed_record.get('enhanced_altitude', None) or parsed_record.get('altitude', None),
+                                "Distance": parsed_record.get('distance', None),
+                                "DurationSeconds": (record_time - activity_start_time).total_seconds(),
+                                "HeartRate": float(parsed_record.get('heart_rate', None)) if parsed_record.get('heart_rate', None) else None,
+                                "Speed": parsed_record.get('enhanced_speed', None) or parsed_record.get('speed', None),
+                                "GradeAdjustedSpeed": (parsed_record.get("unknown_140") / 1000.0) if parsed_record.get("unknown_140") else None,
+                                "RunningEfficiency": ((parsed_record.get("unknown_140") / 1000.0)/parsed_record.get('heart_rate')) if (parsed_record.get("unknown_140") and parsed_record.get('heart_rate')) else None,
+                                "Cadence": parsed_record.get('cadence', None),
+                                "Fractional_Cadence": parsed_record.get('fractional_cadence', None),
+                                "Temperature": parsed_record.get('temperature', None),
+                                "Accumulated_Power": parsed_record.get('accumulated_power', None),
+                                "Power": parsed_record.get('power', None)
+                            }, int(record_time.timestamp())))
                     for session_record in all_sessions_list:
                         if session_record.get('start_time') or session_record.get('timestamp'):
                             raw_idx = session_record.get('message_index', -1)
@@ -779,12 +885,12 @@ def fetch_activity_GPS(activityIDdict): # Uses FIT file by default, falls back t
 
                             point = {
                                 "measurement": "ActivitySession",
-                                "time": session_record['start_time'].replace(tzinfo=pytz.UTC).isoformat() or session_record['timestamp'].replace(tzinfo=pytz.UTC).isoformat(), 
+                                "time": session_record['start_time'].replace(tzinfo=UTC).isoformat() or session_record['timestamp'].replace(tzinfo=UTC).isoformat(), 
                                 "tags": {
                                     "Device": GARMIN_DEVICENAME,
                                     "Database_Name": INFLUXDB_DATABASE,
                                     "ActivityID": activityID,
-                                    "ActivitySelector": activity_start_time.strftime('%Y%m%dT%H%M%SUTC-') + activity_type
+                                    "ActivitySelector": activity_selector
                                 },
                                 "fields": {
                                     "Index": idx,
@@ -807,12 +913,12 @@ def fetch_activity_GPS(activityIDdict): # Uses FIT file by default, falls back t
                         if length_record.get('start_time') or length_record.get('timestamp'):
                             point = {
                                 "measurement": "ActivityLength",
-                                "time": length_record['start_time'].replace(tzinfo=pytz.UTC).isoformat() or length_record['timestamp'].replace(tzinfo=pytz.UTC).isoformat(), 
+                                "time": length_record['start_time'].replace(tzinfo=UTC).isoformat() or length_record['timestamp'].replace(tzinfo=UTC).isoformat(), 
                                 "tags": {
                                     "Device": GARMIN_DEVICENAME,
                                     "Database_Name": INFLUXDB_DATABASE,
                                     "ActivityID": activityID,
-                                    "ActivitySelector": activity_start_time.strftime('%Y%m%dT%H%M%SUTC-') + activity_type
+                                    "ActivitySelector": activity_selector
                                 },
                                 "fields": {
                                     "Index": int(length_record.get('message_index', -1)) + 1,
@@ -831,12 +937,12 @@ def fetch_activity_GPS(activityIDdict): # Uses FIT file by default, falls back t
                         if lap_record.get('start_time') or lap_record.get('timestamp'):
                             point = {
                                 "measurement": "ActivityLap",
-                                "time": lap_record['start_time'].replace(tzinfo=pytz.UTC).isoformat() or lap_record['timestamp'].replace(tzinfo=pytz.UTC).isoformat(), 
+                                "time": lap_record['start_time'].replace(tzinfo=UTC).isoformat() or lap_record['timestamp'].replace(tzinfo=UTC).isoformat(), 
                                 "tags": {
                                     "Device": GARMIN_DEVICENAME,
                                     "Database_Name": INFLUXDB_DATABASE,
                                     "ActivityID": activityID,
-                                    "ActivitySelector": activity_start_time.strftime('%Y%m%dT%H%M%SUTC-') + activity_type
+                                    "ActivitySelector": activity_selector
                                 },
                                 "fields": {
                                     "Index": int(lap_record.get('message_index', -1)) + 1,
@@ -864,7 +970,7 @@ def fetch_activity_GPS(activityIDdict): # Uses FIT file by default, falls back t
                             points_list.append(point)
                     if KEEP_FIT_FILES:
                         os.makedirs(FIT_FILE_STORAGE_LOCATION, exist_ok=True)
-                        fit_path = os.path.join(FIT_FILE_STORAGE_LOCATION, activity_start_time.strftime('%Y%m%dT%H%M%SUTC-') + activity_type + ".fit")
+                        fit_path = os.path.join(FIT_FILE_STORAGE_LOCATION, activity_selector + ".fit")
                         with open(fit_path, "wb") as f:
                             f.write(fit_data)
                         logging.info(f"Success : Activity ID {activityID} stored in output file {fit_path}")
@@ -872,66 +978,59 @@ def fetch_activity_GPS(activityIDdict): # Uses FIT file by default, falls back t
             logging.error(err)
             logging.warning(f"Fallback : Failed to use FIT file for activityID {activityID} - Trying TCX file...")
             try:
-                root = ET.fromstring(garmin_obj.download_activity(activityID, dl_fmt=garmin_obj.ActivityDownloadFormat.TCX).decode("UTF-8"))
+                tcx_data = cached_tcx(garmin_obj, activityID) # same download get_vo2max_segmented and the custom lactate threshold use
             except requests.exceptions.Timeout as err:
                 logging.warning(f"Request timeout for fetching large activity record {activityID} - skipping record")
                 return []
             except Exception as err:
                 logging.exception(f"Unable to fetch TCX for activity record {activityID} : skipping record")
                 return []
-            ns = {"tcx": "http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2", "ns3": "http://www.garmin.com/xmlschemas/ActivityExtension/v2"}
-            for activity in root.findall("tcx:Activities/tcx:Activity", ns):
-                activity_start_time = datetime.fromisoformat(activity.find("tcx:Id", ns).text.strip("Z"))
-                lap_index = 1
-                for lap in activity.findall("tcx:Lap", ns):
-                    lap_start_time = datetime.fromisoformat(lap.attrib.get("StartTime").strip("Z"))
-                    for tp in lap.findall(".//tcx:Trackpoint", ns):
-                        time_obj = datetime.fromisoformat(tp.findtext("tcx:Time", default=None, namespaces=ns).strip("Z"))
-                        lat = tp.findtext("tcx:Position/tcx:LatitudeDegrees", default=None, namespaces=ns)
-                        lon = tp.findtext("tcx:Position/tcx:LongitudeDegrees", default=None, namespaces=ns)
-                        alt = tp.findtext("tcx:AltitudeMeters", default=None, namespaces=ns)
-                        dist = tp.findtext("tcx:DistanceMeters", default=None, namespaces=ns)
-                        hr = tp.findtext("tcx:HeartRateBpm/tcx:Value", default=None, namespaces=ns)
-                        speed = tp.findtext("tcx:Extensions/ns3:TPX/ns3:Speed", default=None, namespaces=ns)
-
-                        try: lat = float(lat)
-                        except: lat = None
-                        try: lon = float(lon)
-                        except: lon = None
-                        try: alt = float(alt)
-                        except: alt = None
-                        try: dist = float(dist)
-                        except: dist = None
-                        try: hr = float(hr)
-                        except: hr = None
-                        try: speed = float(speed)
-                        except: speed = None
-
-                        point = {
-                            "measurement": "ActivityGPS",
-                            "time": time_obj.isoformat(), 
-                            "tags": {
-                                "Device": GARMIN_DEVICENAME,
-                                "Database_Name": INFLUXDB_DATABASE,
-                                "ActivityID": activityID,
-                                "ActivitySelector": activity_start_time.strftime('%Y%m%dT%H%M%SUTC-') + activity_type
-                            },
-                            "fields": {
+            activity_start_time, lap_index, track = None, 0, []
+            # Streamed with iterparse instead of building the whole document tree - every Trackpoint is cleared
+            # once its values are collected, so memory stays flat even for long rides
+            try:
+                for event, tp in ET.iterparse(io.BytesIO(tcx_data), events=("start", "end")):
+                    if event == "start":
+                        if tp.tag == TCX_ACTIVITY_TAG:
+                            activity_start_time, lap_index, track = None, 0, []
+                        elif tp.tag == TCX_LAP_TAG:
+                            lap_index += 1
+                        continue
+                    if tp.tag == TCX_ID_TAG and activity_start_time is None:
+                        activity_start_time = datetime.fromisoformat(tcx_time_utc(tp.text))
+                    elif tp.tag == TCX_TRACKPOINT_TAG:
+                        time_str = tcx_time_utc(tp.findtext(TCX_TIME_PATH)) # "Z" or any +hh:mm offset, normalised to naive UTC
+                        if time_str != "NaT": # a row needs a timestamp, untimed Trackpoints are dropped
+                            track.append((time_str, tp.findtext(TCX_LAT_PATH), tp.findtext(TCX_LON_PATH), tp.findtext(TCX_ALT_PATH),
+                                          tp.findtext(TCX_DIST_PATH), tp.findtext(TCX_HR_PATH), tp.findtext(TCX_SPEED_PATH), lap_index))
+                        tp.clear()
+                    elif tp.tag == TCX_ACTIVITY_TAG and track:
+                        time_strs, *value_columns, laps = zip(*track)
+                        # Trackpoint times are converted for the whole activity in one numpy call, both into the
+                        # integer-second row timestamps and into offsets from the activity start
+                        times = np.array(time_strs, dtype="datetime64[ms]")
+                        timestamps = times.astype("datetime64[s]").astype(np.int64).tolist()
+                        durations = ((times - np.datetime64(activity_start_time, "ms")) / np.timedelta64(1, "s")).tolist()
+                        lats, lons, alts, dists, hrs, speeds = (_tcx_float_column(column) for column in value_columns)
+                        activity_selector = activity_start_time.strftime('%Y%m%dT%H%M%SUTC-') + activity_type
+                        trackpoint_tag_set = _lp_tag_set(ActivityID=activityID, ActivitySelector=activity_selector)
+                        for timestamp, lat, lon, alt, dist, hr, speed, lap, duration in zip(timestamps, lats, lons, alts, dists, hrs, speeds, laps, durations):
+                            points_list.append(_lp_row("ActivityGPS", trackpoint_tag_set, {
                                 "ActivityName": activity_type,
                                 "Activity_ID": activityID,
                                 "Latitude": lat,
                                 "Longitude": lon,
                                 "Altitude": alt,
                                 "Distance": dist,
-                                "DurationSeconds": (time_obj - activity_start_time).total_seconds(),
+                                "DurationSeconds": duration,
                                 "HeartRate": hr,
                                 "Speed": speed,
-                                "lap": lap_index
-                            }
-                        }
-                        points_list.append(point)
-
-                    lap_index += 1
+                                "lap": lap
+                            }, timestamp))
+                        track = []
+            except ET.ParseError as err:
+                logging.exception(f"Unable to parse TCX for activity record {activityID} : skipping record")
+                return []
         logging.info(f"Success : Fetching detailed activity for Activity ID {activityID}")
         PARSED_ACTIVITY_ID_LIST.append(activityID)
     return points_list
@@ -952,7 +1051,7 @@ def get_lactate_threshold(date_str):
                 if value is not None:
                     points_list.append({
                         "measurement": "LactateThreshold",
-                        "time": datetime.fromtimestamp(datetime.strptime(date_str, "%Y-%m-%d").timestamp(), tz=pytz.timezone("UTC")).isoformat(),
+                        "time": datetime.fromtimestamp(datetime.strptime(date_str, "%Y-%m-%d").timestamp(), tz=UTC).isoformat(),
                         "tags": {
                             "Device": GARMIN_DEVICENAME,
                             "Database_Name": INFLUXDB_DATABASE
@@ -965,7 +1064,7 @@ def get_lactate_threshold(date_str):
     
 def get_training_status(date_str):
     points_list = []
-    ts_list_all = garmin_obj.get_training_status(date_str)
+    ts_list_all = cached_training_status(garmin_obj, date_str) # shared with get_training_load_focus
     ts_training_data_all = (ts_list_all.get("mostRecentTrainingStatus") or {}).get("latestTrainingStatusData", {})
 
     if ts_training_data_all:
@@ -986,7 +1085,7 @@ def get_training_status(date_str):
             if ts_dict.get("timestamp") and any(value is not None for value in data_fields.values()):
                 points_list.append({
                     "measurement": "TrainingStatus",
-                    "time": datetime.fromtimestamp(ts_dict["timestamp"]/1000, tz=pytz.timezone("UTC")).isoformat(),
+                    "time": datetime.fromtimestamp(ts_dict["timestamp"]/1000, tz=UTC).isoformat(),
                     "tags": {
                         "Device": GARMIN_DEVICENAME,
                         "Database_Name": INFLUXDB_DATABASE
@@ -1017,7 +1116,7 @@ def get_training_readiness(date_str):
             if (not all(value is None for value in data_fields.values())) and tr_dict.get('timestamp'):
                 points_list.append({
                     "measurement":  "TrainingReadiness",
-                    "time": pytz.timezone("UTC").localize(datetime.strptime(tr_dict['timestamp'],"%Y-%m-%dT%H:%M:%S.%f")).isoformat(),
+                    "time": _parse_gmt(tr_dict['timestamp']),
                     "tags": {
                         "Device": GARMIN_DEVICENAME,
                         "Database_Name": INFLUXDB_DATABASE
@@ -1043,7 +1142,7 @@ def get_hillscore(date_str):
         if not all(value is None for value in data_fields.values()):
             points_list.append({
                 "measurement":  "HillScore",
-                "time": datetime.strptime(date_str,"%Y-%m-%d").replace(hour=0, tzinfo=pytz.UTC).isoformat(), # Use GMT 00:00 for daily record
+                "time": utc_midnight(date_str).isoformat(), # Use GMT 00:00 for daily record
                 "tags": {
                     "Device": GARMIN_DEVICENAME,
                     "Database_Name": INFLUXDB_DATABASE
@@ -1068,7 +1167,7 @@ def get_race_predictions(date_str):
         if not all(value is None for value in data_fields.values()):
             points_list.append({
                 "measurement":  "RacePredictions",
-                "time": datetime.strptime(date_str,"%Y-%m-%d").replace(hour=0, tzinfo=pytz.UTC).isoformat(), # Use GMT 00:00 for daily record
+                "time": utc_midnight(date_str).isoformat(), # Use GMT 00:00 for daily record
                 "tags": {
                     "Device": GARMIN_DEVICENAME,
                     "Database_Name": INFLUXDB_DATABASE
@@ -1092,7 +1191,7 @@ def get_fitness_age(date_str):
             if not all(value is None for value in data_fields.values()):
                 points_list.append({
                     "measurement": "FitnessAge",
-                    "time": datetime.strptime(date_str,"%Y-%m-%d").replace(hour=0, tzinfo=pytz.UTC).isoformat(), # Use GMT 00:00 for daily record
+                    "time": utc_midnight(date_str).isoformat(), # Use GMT 00:00 for daily record
                     "tags": {
                         "Device": GARMIN_DEVICENAME,
                         "Database_Name": INFLUXDB_DATABASE
@@ -1112,7 +1211,7 @@ def get_vo2_max(date_str):
             if vo2_max_value or vo2_max_value_cycling:
                 points_list.append({
                     "measurement":  "VO2_Max",
-                    "time": datetime.strptime(date_str,"%Y-%m-%d").replace(hour=0, tzinfo=pytz.UTC).isoformat(), # Use GMT 00:00 for daily record
+                    "time": utc_midnight(date_str).isoformat(), # Use GMT 00:00 for daily record
                     "tags": {
                         "Device": GARMIN_DEVICENAME,
                         "Database_Name": INFLUXDB_DATABASE
@@ -1131,7 +1230,7 @@ def get_endurance_score(date_str):
         if endurance_dict.get("overallScore"):
             points_list.append({
                 "measurement":  "EnduranceScore",
-                "time": pytz.timezone("UTC").localize(datetime.strptime(date_str,"%Y-%m-%d")).isoformat(), # Use GMT 00:00 is timestamp is not available
+                "time": utc_midnight(date_str).isoformat(), # Use GMT 00:00 is timestamp is not available
                 "tags": {
                     "Device": GARMIN_DEVICENAME,
                     "Database_Name": INFLUXDB_DATABASE
@@ -1157,7 +1256,7 @@ def get_blood_pressure(date_str):
             if not all(value is None for value in data_fields.values()) and 'measurementTimestampGMT' in bp_measurement:
                 points_list.append({
                     "measurement":  "BloodPressure",
-                    "time": pytz.UTC.localize(datetime.strptime(bp_measurement['measurementTimestampGMT'], '%Y-%m-%dT%H:%M:%S.%f')),
+                    "time": _parse_gmt(bp_measurement['measurementTimestampGMT']),
                     "tags": {
                         "Device": GARMIN_DEVICENAME,
                         "Database_Name": INFLUXDB_DATABASE,
@@ -1180,7 +1279,7 @@ def get_hydration(date_str):
     if not all(value is None for value in data_fields.values()):
         points_list.append({
             "measurement":  "Hydration",
-            "time": datetime.strptime(date_str,"%Y-%m-%d").replace(hour=0, tzinfo=pytz.UTC).isoformat(), # Use GMT 00:00 for daily record
+            "time": utc_midnight(date_str).isoformat(), # Use GMT 00:00 for daily record
             "tags": {
                 "Device": GARMIN_DEVICENAME,
                 "Database_Name": INFLUXDB_DATABASE
@@ -1209,7 +1308,7 @@ def get_solar_intensity(date_str):
             if not all(value is None for value in data_fields.values()) and 'readingTimestampGmt' in si_measurement:
                 points_list.append({
                     "measurement":  "SolarIntensity",
-                    "time": pytz.UTC.localize(datetime.strptime(si_measurement['readingTimestampGmt'], '%Y-%m-%dT%H:%M:%S.%f')),
+                    "time": _parse_gmt(si_measurement['readingTimestampGmt']),
                     "tags": {
                         "Device": GARMIN_DEVICENAME,
                         "Database_Name": INFLUXDB_DATABASE
@@ -1223,8 +1322,95 @@ def get_solar_intensity(date_str):
 
 
 # %%
-def daily_fetch_write(date_str):
-    if REQUEST_INTRADAY_DATA_REFRESH and (datetime.strptime(date_str, "%Y-%m-%d") <= (datetime.today() - timedelta(days=IGNORE_INTRADAY_DATA_REFRESH_DAYS))):
+def is_rate_limited(err):
+    # garminconnect only raises GarminConnectTooManyRequestsError on login - data calls surface a 429 either as
+    # GarthHTTPError or, once garth's own urllib3 retries on 429/5xx are used up, as requests' RetryError
+    if isinstance(err, (GarminConnectTooManyRequestsError, requests.exceptions.RetryError)):
+        return True
+    response = getattr(getattr(err, 'error', None), 'response', None)
+    return isinstance(err, GarthHTTPError) and response is not None and response.status_code == 429
+
+def retry_after_seconds(err):
+    # Seconds requested by the 429 response's Retry-After header, when Garmin sends one (delay-seconds form only)
+    response = getattr(getattr(err, 'error', None), 'response', None)
+    retry_after = response.headers.get('Retry-After') if response is not None else None
+    try:
+        return max(float(retry_after), 0) if retry_after else None
+    except ValueError:
+        return None
+
+def fetch_with_retry(fetcher, date_str, attempts=4):
+    # Short exponential backoff with jitter for transient rate limits, so a single 429 doesn't cost the
+    # whole FETCH_FAILED_WAIT_SECONDS pause - that only happens in fetch_write_bulk once these retries are exhausted
+    for attempt in range(attempts):
+        try:
+            return fetcher(date_str)
+        except (GarminConnectTooManyRequestsError, GarthHTTPError, requests.exceptions.RetryError) as err:
+            if not is_rate_limited(err):
+                raise
+            if attempt == attempts - 1:
+                raise GarminConnectTooManyRequestsError(str(err)) from err
+            # a Retry-After from the server replaces the guessed backoff - no longer waiting than Garmin asks for
+            retry_after = retry_after_seconds(err)
+            if retry_after is not None:
+                wait_seconds = min(retry_after, FETCH_FAILED_WAIT_SECONDS) + random.uniform(0, 1)
+            else:
+                wait_seconds = min(max(RATE_LIMIT_CALLS_SECONDS * 2 ** attempt, 5), 300) + random.uniform(0, 5)
+            logging.warning(f"Rate limited while running {fetcher.__name__} for date {date_str} - retrying in {wait_seconds:.0f} seconds")
+            time.sleep(wait_seconds)
+
+def get_activity_data(date_str):
+    activity_summary_points_list, activity_with_gps_id_dict = get_activity_summary(date_str)
+    return activity_summary_points_list + fetch_activity_GPS(activity_with_gps_id_dict)
+
+# (FETCH_SELECTION value, fetcher) in the order points are written
+DAILY_FETCHERS = [
+    ('daily_avg', get_daily_stats),
+    ('sleep', get_sleep_data),
+    ('steps', get_intraday_steps),
+    ('heartrate', get_intraday_hr),
+    ('stress', get_intraday_stress),
+    ('breathing', get_intraday_br),
+    ('hrv', get_intraday_hrv),
+    ('fitness_age', get_fitness_age),
+    ('vo2', get_vo2_max),
+    ('race_prediction', get_race_predictions),
+    ('body_composition', get_body_composition),
+    ('lactate_threshold', get_lactate_threshold),
+    ('training_status', get_training_status),
+    ('training_readiness', get_training_readiness),
+    ('hill_score', get_hillscore),
+    ('endurance_score', get_endurance_score),
+    ('blood_pressure', get_blood_pressure),
+    ('hydration', get_hydration),
+    ('activity', get_activity_data),
+    ('solar_intensity', get_solar_intensity),
+]
+# Fetchers that only return data recorded by the watch - skipped for days without any synced wellness data
+WELLNESS_FETCHERS = {get_daily_stats, get_sleep_data, get_intraday_steps, get_intraday_hr, get_intraday_stress, get_intraday_br, get_intraday_hrv}
+
+# Custom metrics that need the day's resting/max HR, or at least one activity - skipped on days without either
+WELLNESS_METRICS = {get_vo2max, get_vo2max_segmented, get_custom_lactate_threshold}
+ACTIVITY_METRICS = {get_activity_vo2, get_vo2max_segmented, get_custom_lactate_threshold}
+
+def has_wellness_data(date_str):
+    return bool((cached_stats(garmin_obj, date_str) or {}).get('wellnessStartTimeGmt'))
+
+def has_activities(date_str):
+    return bool(cached_activities(garmin_obj, date_str))
+
+def warm_heart_rates(date_str):
+    cached_heart_rates(garmin_obj, date_str)
+
+# %%
+def daily_fetch(date_str):
+    # Requests every selected Garmin endpoint for date_str and returns the pending results in write order - a date without
+    # synced data still gets a deque, just without the watch-only fetchers. The one exception is a REQUEST_INTRADAY_DATA_REFRESH
+    # answered with NO_FILES_FOUND, which returns None so daily_write skips the date entirely. Safe to run in the background
+    # while another date is written.
+    global FETCH_TODAY
+    FETCH_TODAY = datetime.today()
+    if REQUEST_INTRADAY_DATA_REFRESH and (datetime.strptime(date_str, "%Y-%m-%d") <= (FETCH_TODAY - timedelta(days=IGNORE_INTRADAY_DATA_REFRESH_DAYS))):
         data_refresh_response = garmin_obj.connectapi(f"wellness-service/wellness/epoch/request/{date_str}", method="POST").get("status", "Unknown")
         logging.info(f"Intraday data refresh request status: {data_refresh_response}")
         if data_refresh_response == "SUBMITTED":
@@ -1245,86 +1431,155 @@ def daily_fetch_write(date_str):
         else:
             logging.info(f"Refresh response is unknown!")
             time.sleep(5)
-    if 'daily_avg' in FETCH_SELECTION:
-        write_points_to_influxdb(get_daily_stats(date_str))
-    if 'sleep' in FETCH_SELECTION:
-        write_points_to_influxdb(get_sleep_data(date_str))
-    if 'steps' in FETCH_SELECTION:
-        write_points_to_influxdb(get_intraday_steps(date_str))
-    if 'heartrate' in FETCH_SELECTION:
-        write_points_to_influxdb(get_intraday_hr(date_str))
-    if 'stress' in FETCH_SELECTION:
-        write_points_to_influxdb(get_intraday_stress(date_str))
-    if 'breathing' in FETCH_SELECTION:
-        write_points_to_influxdb(get_intraday_br(date_str))
-    if 'hrv' in FETCH_SELECTION:
-        write_points_to_influxdb(get_intraday_hrv(date_str))
-    if 'fitness_age' in FETCH_SELECTION:
-        write_points_to_influxdb(get_fitness_age(date_str))
-    if 'vo2' in FETCH_SELECTION:
-        write_points_to_influxdb(get_vo2_max(date_str))
-    if 'race_prediction' in FETCH_SELECTION:
-        write_points_to_influxdb(get_race_predictions(date_str))
-    if 'body_composition' in FETCH_SELECTION:
-        write_points_to_influxdb(get_body_composition(date_str))
-    if 'lactate_threshold' in FETCH_SELECTION:
-        write_points_to_influxdb(get_lactate_threshold(date_str))
-    if 'training_status' in FETCH_SELECTION:
-        write_points_to_influxdb(get_training_status(date_str))
-    if 'training_readiness' in FETCH_SELECTION:
-        write_points_to_influxdb(get_training_readiness(date_str))
-    if 'hill_score' in FETCH_SELECTION:
-        write_points_to_influxdb(get_hillscore(date_str))
-    if 'endurance_score' in FETCH_SELECTION:
-        write_points_to_influxdb(get_endurance_score(date_str))
-    if 'blood_pressure' in FETCH_SELECTION:
-        write_points_to_influxdb(get_blood_pressure(date_str))
-    if 'hydration' in FETCH_SELECTION:
-        write_points_to_influxdb(get_hydration(date_str))
-    if 'activity' in FETCH_SELECTION:
-        activity_summary_points_list, activity_with_gps_id_dict = get_activity_summary(date_str)
-        write_points_to_influxdb(activity_summary_points_list)
-        write_points_to_influxdb(fetch_activity_GPS(activity_with_gps_id_dict))
-    if 'solar_intensity' in FETCH_SELECTION:
-        write_points_to_influxdb(get_solar_intensity(date_str))
+    # Garmin endpoints for a day are independent of each other, so they are requested in parallel
+    # (bounded by MAX_CONCURRENT_FETCHES) and written back in the usual order
+    selected_fetchers = [fetcher for selection, fetcher in DAILY_FETCHERS if selection in FETCH_SELECTION]
+    if not fetch_with_retry(has_wellness_data, date_str): # first Garmin call for the date, so it gets the same 429 handling as the fetchers
+        logging.info(f"No wellness data synced for date {date_str} - skipping watch-only intraday metrics")
+        selected_fetchers = [fetcher for fetcher in selected_fetchers if fetcher not in WELLNESS_FETCHERS]
+    if get_intraday_hr in selected_fetchers and get_activity_data in selected_fetchers:
+        fetch_with_retry(warm_heart_rates, date_str) # both read the day's HR (activity TRIMP), and the cache has no single-flight to stop them racing
+    return deque(FETCH_EXECUTOR.submit(fetch_with_retry, fetcher, date_str) for fetcher in selected_fetchers)
+
+def daily_write(date_str, futures):
+    if futures is None: # intraday data refresh found no files for the date, see daily_fetch
+        return
+    while futures:
+        write_points_to_influxdb(futures.popleft().result()) # drop each future once written so its point list can be freed
     
     #### custom
-    # write_points_to_influxdb(get_training_load(garmin_obj, date_str))
-    write_points_to_influxdb(get_vo2max(garmin_obj, date_str, GARMIN_DEVICENAME))
-    write_points_to_influxdb(get_activity_vo2(garmin_obj, date_str, influxdbclient, GARMIN_DEVICENAME))
-    write_points_to_influxdb(get_vo2max_segmented(garmin_obj, date_str, GARMIN_DEVICENAME))
-    # write_points_to_influxdb(get_training_readiness(garmin_obj, date_str, influxdbclient, GARMIN_DEVICENAME))
-    write_points_to_influxdb(get_custom_lactate_threshold(garmin_obj, date_str, GARMIN_DEVICENAME))
-    write_points_to_influxdb(get_acwr(garmin_obj, date_str, influxdbclient, GARMIN_DEVICENAME))
-    write_points_to_influxdb(get_hrv_baseline(garmin_obj, date_str, influxdbclient, GARMIN_DEVICENAME))
-    write_points_to_influxdb(get_training_load_focus(garmin_obj, date_str, GARMIN_DEVICENAME))
-    write_points_to_influxdb(get_readiness_inputs(garmin_obj, date_str, influxdbclient, GARMIN_DEVICENAME))
+    flush_points_to_influxdb() # custom metrics below read back data written above
+    # The custom metrics only read the flushed data (never each other's points, which stay buffered until
+    # the next flush), so they are computed concurrently and written back in the usual order
+    custom_metrics = [
+        # (get_training_load, (garmin_obj, date_str)),
+        (get_vo2max, (garmin_obj, date_str, GARMIN_DEVICENAME)),
+        (get_activity_vo2, (garmin_obj, date_str, influxdbclient, GARMIN_DEVICENAME)),
+        (get_vo2max_segmented, (garmin_obj, date_str, GARMIN_DEVICENAME)),
+        # (get_training_readiness_computed, (garmin_obj, date_str, influxdbclient, GARMIN_DEVICENAME)),
+        (get_custom_lactate_threshold, (garmin_obj, date_str, GARMIN_DEVICENAME)),
+        (get_acwr, (garmin_obj, date_str, influxdbclient, GARMIN_DEVICENAME)),
+        (get_hrv_baseline, (garmin_obj, date_str, influxdbclient, GARMIN_DEVICENAME)),
+        (get_training_load_focus, (garmin_obj, date_str, GARMIN_DEVICENAME)),
+        (get_readiness_inputs, (garmin_obj, date_str, influxdbclient, GARMIN_DEVICENAME)),
+    ]
+    # Both probes are usually served from the per-date caches, a miss is fetched with the usual 429 handling
+    skipped_metrics = set()
+    if not fetch_with_retry(has_wellness_data, date_str):
+        skipped_metrics |= WELLNESS_METRICS
+    if not fetch_with_retry(has_activities, date_str):
+        skipped_metrics |= ACTIVITY_METRICS
+    if skipped_metrics:
+        logging.info(f"No wellness or activity data for date {date_str} - skipping the custom metrics that depend on it")
+        custom_metrics = [(metric, args) for metric, args in custom_metrics if metric not in skipped_metrics]
+    # inputs shared by several metrics (InfluxDB history, TCX tracks) are loaded once here rather than by each racing metric
+    warm_day_caches(garmin_obj, date_str, influxdbclient, tracks=bool({get_vo2max_segmented, get_custom_lactate_threshold} - skipped_metrics), max_workers=MAX_CONCURRENT_FETCHES)
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_FETCHES) as executor:
+        for future in [executor.submit(metric, *args) for metric, args in custom_metrics]:
+            write_points_to_influxdb(future.result())
     ####
+    # the rest of the buffer goes out with the next day's points (or at the end of fetch_write_bulk)
+
+def daily_fetch_write(date_str):
+    daily_write(date_str, daily_fetch(date_str))
 
 
 # %%
-def fetch_write_bulk(start_date_str, end_date_str):
+def _influxql_string(value):
+    # quoted InfluxQL string literal, for the V3 queries that can't bind parameters
+    return "'" + str(value).replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+def get_ingested_dates(start_date_str, end_date_str):
+    # Dates between start and end that already have a ReadinessInputs point from this device (and user, on a shared database).
+    # It is the last point daily_write buffers for a date, so a date interrupted before all its custom metrics reached the
+    # database is fetched again. The point is stamped at 07:00 UTC of its date, which the rounding to the nearest UTC midnight
+    # below maps back to that date. Today is never reported: the periodic sync writes its ReadinessInputs before the day is over
+    query_start = (datetime.strptime(start_date_str, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    query_end = (datetime.strptime(end_date_str, "%Y-%m-%d") + timedelta(days=2)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    tag_filter = {"Device": GARMIN_DEVICENAME}
+    if TAG_MEASUREMENTS_WITH_USER_EMAIL:
+        tag_filter['User_ID'] = garmin_obj.garth.profile.get('userName','Unknown')
+    try:
+        if INFLUXDB_VERSION == '1':
+            tag_clause = "".join(f" AND \"{tag}\" = ${tag}" for tag in tag_filter)
+            query = f"SELECT \"acuteLoad\" FROM \"ReadinessInputs\" WHERE time >= $start AND time < $end{tag_clause}"
+            times = [datetime.fromtimestamp(point['time'], tz=UTC) for point in influxdbclient.query(query, bind_params={"start": query_start, "end": query_end, **tag_filter}, epoch='s').get_points()]
+        else:
+            tag_clause = "".join(f" AND \"{tag}\" = {_influxql_string(value)}" for tag, value in tag_filter.items())
+            query = f"SELECT \"acuteLoad\" FROM \"ReadinessInputs\" WHERE time >= '{query_start}' AND time < '{query_end}'{tag_clause}"
+            times = [UTC.localize(row['time']) for row in influxdbclient.query(query=query, language="influxql").to_pylist()]
+    except (InfluxDBClientError, InfluxDBError) as err:
+        logging.warning(f"Unable to look up already ingested dates, fetching all of them : {err}")
+        return set()
+    ingested_dates = {(point_time + timedelta(hours=12)).strftime("%Y-%m-%d") for point_time in times}
+    today_str = datetime.today().strftime("%Y-%m-%d")
+    return {date_str for date_str in ingested_dates if date_str < today_str}
+
+def read_last_sync_state():
+    # Watch upload time recorded by a previous run of the periodic sync, None if there is no usable state file
+    try:
+        with open(LAST_SYNC_STATE_FILE) as f:
+            return datetime.fromisoformat(json.load(f)["last_sync"]).astimezone(UTC)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def write_last_sync_state(last_sync_time_UTC):
+    try:
+        temp_file = f"{LAST_SYNC_STATE_FILE}.{os.getpid()}.tmp"
+        with open(temp_file, "w") as f:
+            json.dump({"last_sync": last_sync_time_UTC.isoformat()}, f)
+        os.replace(temp_file, LAST_SYNC_STATE_FILE) # atomic, a crash never leaves a partial state file behind
+    except OSError as err:
+        logging.warning(f"Unable to record last sync time in {LAST_SYNC_STATE_FILE} : {err}")
+
+def fetch_write_bulk(start_date_str, end_date_str, skip_existing=False):
     global garmin_obj
     #influxdbclient.query('DROP MEASUREMENT "ReadinessInputs"')
 
     logging.info(f"Fetching data for the given period in chronological order: "
                  f"{start_date_str} → {end_date_str}")
-    time.sleep(3)
+    clear_garmin_cache() # once per cycle - the caches are keyed by date, this only keeps "today" from being served stale on the next cycle
     write_points_to_influxdb(get_last_sync())
-    for current_date in iter_days(start_date_str, end_date_str):
+    # The next date is fetched in the background (single slot) while the current one is written to InfluxDB
+    prefetcher = ThreadPoolExecutor(max_workers=1)
+    prefetched_date, prefetched = None, None
+    dates = list(iter_days(start_date_str, end_date_str))
+    if skip_existing:
+        ingested_dates = get_ingested_dates(start_date_str, end_date_str)
+        remaining_dates = [date_str for date_str in dates if date_str not in ingested_dates]
+        logging.info(f"Skipping {len(dates) - len(remaining_dates)} dates that are already fully written to the database")
+        dates = remaining_dates
+    for index, current_date in enumerate(dates):
+        next_date = dates[index + 1] if index + 1 < len(dates) else None
         repeat_loop = True
+        rate_limit_wait = FETCH_FAILED_WAIT_SECONDS // 4 # doubles on every consecutive 429 for the same date, capped at FETCH_FAILED_WAIT_SECONDS
         while repeat_loop:
             try:
-                daily_fetch_write(current_date)
+                if prefetched_date == current_date:
+                    pending, prefetched_date, prefetched = prefetched, None, None # a retry of this date fetches it again
+                    futures = pending.result()
+                else:
+                    futures = daily_fetch(current_date)
+                if next_date and prefetched_date != next_date:
+                    prefetched_date, prefetched = next_date, prefetcher.submit(daily_fetch, next_date)
+                daily_write(current_date, futures)
                 logging.info(f"Success : Fetched all available health metrics for date {current_date} (skipped any if unavailable)")
-                logging.info(f"Waiting : for {RATE_LIMIT_CALLS_SECONDS} seconds")
-                time.sleep(RATE_LIMIT_CALLS_SECONDS)
+                if next_date: # the pause only spaces out consecutive dates, nothing follows the last one
+                    logging.info(f"Waiting : for {RATE_LIMIT_CALLS_SECONDS} seconds")
+                    time.sleep(RATE_LIMIT_CALLS_SECONDS)
                 repeat_loop = False
-            except GarminConnectTooManyRequestsError as err:
+            except (GarminConnectTooManyRequestsError, requests.exceptions.RetryError) as err: # RetryError : urllib3 gave up on repeated 429s
                 logging.error(err)
                 logging.info(f"Too many requests (429) : Failed to fetch one or more metrics - will retry for date {current_date}")
-                logging.info(f"Waiting : for {FETCH_FAILED_WAIT_SECONDS} seconds")
-                time.sleep(FETCH_FAILED_WAIT_SECONDS)
+                # jittered so repeated retries don't line up with Garmin's rate limit window, and never
+                # shorter than a Retry-After sent with the 429 that exhausted fetch_with_retry (capped the same way)
+                wait_seconds = rate_limit_wait * random.uniform(0.5, 1.5)
+                retry_after = retry_after_seconds(err.__cause__)
+                if retry_after is not None:
+                    wait_seconds = max(wait_seconds, min(retry_after, FETCH_FAILED_WAIT_SECONDS))
+                logging.info(f"Waiting : for {wait_seconds:.0f} seconds")
+                time.sleep(wait_seconds)
+                rate_limit_wait = min(rate_limit_wait * 2, FETCH_FAILED_WAIT_SECONDS)
                 repeat_loop = True
             except (
                     GarminConnectConnectionError,
@@ -1335,8 +1590,9 @@ def fetch_write_bulk(start_date_str, end_date_str):
                     ) as err:
                 logging.error(err)
                 logging.info(f"Connection Error : Failed to fetch one or more metrics - skipping date {current_date}")
-                logging.info(f"Waiting : for {RATE_LIMIT_CALLS_SECONDS} seconds")
-                time.sleep(RATE_LIMIT_CALLS_SECONDS)
+                if next_date:
+                    logging.info(f"Waiting : for {RATE_LIMIT_CALLS_SECONDS} seconds")
+                    time.sleep(RATE_LIMIT_CALLS_SECONDS)
                 repeat_loop = False
             except GarminConnectAuthenticationError as err:
                 logging.error(err)
@@ -1344,6 +1600,8 @@ def fetch_write_bulk(start_date_str, end_date_str):
                 garmin_obj = garmin_login()
                 time.sleep(5)
                 repeat_loop = True
+    prefetcher.shutdown()
+    flush_points_to_influxdb() # one write for whatever the whole date range left in the buffer
 
 
 # %%
@@ -1351,19 +1609,23 @@ garmin_obj = garmin_login()
 
 # %%
 if MANUAL_START_DATE:
-    fetch_write_bulk(MANUAL_START_DATE, MANUAL_END_DATE)
+    fetch_write_bulk(MANUAL_START_DATE, MANUAL_END_DATE, skip_existing=SKIP_EXISTING_DATES)
     logging.info(f"Bulk update success : Fetched all available health metrics for date range {MANUAL_START_DATE} to {MANUAL_END_DATE}")
     exit(0)
 else:
-    try:
-        if INFLUXDB_VERSION == "1":
-            last_influxdb_sync_time_UTC = pytz.utc.localize(datetime.strptime(list(influxdbclient.query(f"SELECT * FROM HeartRateIntraday ORDER BY time DESC LIMIT 1").get_points())[0]['time'],"%Y-%m-%dT%H:%M:%SZ"))
-        else:
-            last_influxdb_sync_time_UTC = pytz.utc.localize(influxdbclient.query(query="SELECT * FROM HeartRateIntraday ORDER BY time DESC LIMIT 1", language="influxql").to_pylist()[0]['time'])
-    except Exception as err:
-        logging.error(err)
-        logging.warning("No previously synced data found in local InfluxDB database, defaulting to 7 day initial fetching. Use specific start date ENV variable to bulk update past data")
-        last_influxdb_sync_time_UTC = (datetime.today() - timedelta(days=7)).astimezone(pytz.timezone("UTC"))
+    last_influxdb_sync_time_UTC = read_last_sync_state() if LAST_SYNC_STATE_FILE else None
+    if last_influxdb_sync_time_UTC:
+        logging.info(f"Using last sync time {last_influxdb_sync_time_UTC} UTC recorded in {LAST_SYNC_STATE_FILE}")
+    else:
+        try:
+            if INFLUXDB_VERSION == "1":
+                last_influxdb_sync_time_UTC = pytz.utc.localize(datetime.strptime(list(influxdbclient.query("SELECT * FROM HeartRateIntraday ORDER BY time DESC LIMIT 1").get_points())[0]['time'],"%Y-%m-%dT%H:%M:%SZ"))
+            else:
+                last_influxdb_sync_time_UTC = pytz.utc.localize(influxdbclient.query(query="SELECT * FROM HeartRateIntraday ORDER BY time DESC LIMIT 1", language="influxql").to_pylist()[0]['time'])
+        except Exception as err:
+            logging.error(err)
+            logging.warning("No previously synced data found in local InfluxDB database, defaulting to 7 day initial fetching. Use specific start date ENV variable to bulk update past data")
+            last_influxdb_sync_time_UTC = (datetime.today() - timedelta(days=7)).astimezone(UTC)
     try:
         if USER_TIMEZONE: # If provided by user, using that. 
             local_timediff = datetime.now(tz=pytz.timezone(USER_TIMEZONE)).utcoffset()
@@ -1379,11 +1641,13 @@ else:
         local_timediff = timedelta(hours=0)
     
     while True:
-        last_watch_sync_time_UTC = datetime.fromtimestamp(int(garmin_obj.get_device_last_used().get('lastUsedDeviceUploadTime')/1000)).astimezone(pytz.timezone("UTC"))
+        last_watch_sync_time_UTC = datetime.fromtimestamp(int(get_device_last_used().get('lastUsedDeviceUploadTime')/1000)).astimezone(UTC)
         if last_influxdb_sync_time_UTC < last_watch_sync_time_UTC:
             logging.info(f"Update found : Current watch sync time is {last_watch_sync_time_UTC} UTC")
             fetch_write_bulk(last_influxdb_sync_time_UTC.strftime('%Y-%m-%d'), last_watch_sync_time_UTC.strftime('%Y-%m-%d'))
             last_influxdb_sync_time_UTC = last_watch_sync_time_UTC
+            if LAST_SYNC_STATE_FILE:
+                write_last_sync_state(last_influxdb_sync_time_UTC)
         else:
             logging.info(f"No new data found : Current watch and influxdb sync time is {last_watch_sync_time_UTC} UTC")
         logging.info(f"waiting for {UPDATE_INTERVAL_SECONDS} seconds before next automatic update calls")